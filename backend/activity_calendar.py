@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+# A calendar is stored as {"2026": "<hex>"}: one bit per day of the year,
+# bit 0 = January 1st. 366 bits fit in 46 bytes per year.
+
+
+def _year_bits(calendar: Optional[Dict[str, str]], year: int) -> int:
+    if not calendar:
+        return 0
+    return int(calendar.get(str(year), "0"), 16)
+
+
+def _day_index(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+
+def mark_day(calendar: Optional[Dict[str, str]], day: date) -> Dict[str, str]:
+    """Return a copy of the calendar with `day` set as active"""
+    updated = dict(calendar or {})
+    bits = _year_bits(updated, day.year) | (1 << _day_index(day))
+    updated[str(day.year)] = format(bits, "x")
+    return updated
+
+
+def is_active(calendar: Optional[Dict[str, str]], day: date) -> bool:
+    return bool(_year_bits(calendar, day.year) >> _day_index(day) & 1)
+
+
+def _span_bits(calendar: Optional[Dict[str, str]], first_year: int, last_year: int) -> int:
+    """Concatenate the yearly bitmaps into one integer indexed from Jan 1 of first_year"""
+    bits = 0
+    for year in range(first_year, last_year + 1):
+        offset = (date(year, 1, 1) - date(first_year, 1, 1)).days
+        bits |= _year_bits(calendar, year) << offset
+    return bits
+
+
+def current_streak(calendar: Optional[Dict[str, str]], today: date) -> int:
+    """Consecutive active days ending today (0 if today has no activity)"""
+    if not calendar or not is_active(calendar, today):
+        return 0
+    first_year = min(int(year) for year in calendar)
+    bits = _span_bits(calendar, first_year, today.year)
+    position = (today - date(first_year, 1, 1)).days
+
+    # Flip the window ending at today: the highest 1 left is the most recent inactive day
+    window = (1 << (position + 1)) - 1
+    gaps = ~bits & window
+    return position + 1 if gaps == 0 else position - (gaps.bit_length() - 1)
+
+
+def longest_streak(calendar: Optional[Dict[str, str]]) -> int:
+    """Longest run of active days - one shift-and per day of the longest run"""
+    if not calendar:
+        return 0
+    years = [int(year) for year in calendar]
+    bits = _span_bits(calendar, min(years), max(years))
+    longest = 0
+    while bits:
+        bits &= bits << 1
+        longest += 1
+    return longest
+
+
+def active_days(calendar: Optional[Dict[str, str]], year: int) -> List[date]:
+    """Active days of one year, in order (for the calendar heatmap)"""
+    bits = _year_bits(calendar, year)
+    days = []
+    start = date(year, 1, 1)
+    while bits:
+        low = bits & -bits
+        days.append(start + timedelta(days=low.bit_length() - 1))
+        bits ^= low
+    return days
+
+
+def from_dates(days) -> Dict[str, str]:
+    """Build a calendar from an iterable of active dates"""
+    calendar: Dict[str, int] = {}
+    for day in days:
+        calendar[day.year] = calendar.get(day.year, 0) | (1 << _day_index(day))
+    return {str(year): format(bits, "x") for year, bits in calendar.items()}
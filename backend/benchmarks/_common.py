@@ -0,0 +1,63 @@
+"""
+Setup shared by the benchmark scripts
+Call bootstrap() before importing anything from the backend: it puts the backend on
+sys.path and points the app at a throwaway SQLite database (or at database_url).
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+from typing import List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = "bench"  # Every seeded student's password
+
+
+def bootstrap(database_url: Optional[str] = None, log_level: int = logging.WARNING):
+    """Configure the app for a benchmark run - must happen before the app is imported"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    logging.disable(log_level)
+
+
+def add_story(db, story_id: Optional[int] = None, title: str = "Story 1", questions: int = 5):
+    """Add an active 3-scene story whose quiz has `questions` questions, all answered by option 1"""
+    from database_models import Story
+
+    quiz = [{"question": f"Question {i}", "options": ["a", "b", "c", "d"], "correct": 1} for i in range(questions)]
+    scenes = [{"scene_id": i + 1, "text": "Once upon a time..."} for i in range(3)]
+    story = Story(
+        id=story_id, title=title, description="Benchmark story", difficulty_level="beginner",
+        category="wisdom", scenes=json.dumps(scenes), quiz=json.dumps(quiz), total_scenes=3, is_active=True
+    )
+    db.add(story)
+    return story
+
+
+def add_students(db, count: int) -> List:
+    """Add students bench0..bench{count-1} with their progress rows (committed).
+
+    They share one password hash to keep seeding fast.
+    """
+    from auth_utils import get_password_hash
+    from database_models import User, UserProgress
+
+    hashed = get_password_hash(PASSWORD)
+    users = [User(email=f"bench{i}@example.com", username=f"bench{i}", hashed_password=hashed)
+             for i in range(count)]
+    db.add_all(users)
+    db.commit()
+    db.add_all([UserProgress(user_id=user.id) for user in users])
+    db.commit()
+    return users
+
+
+def pct(values, p: float) -> float:
+    """The p-th percentile of a list of durations in seconds, in milliseconds"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the database layer
+Drives the FastAPI app in-process (httpx ASGI transport, no network) with a mix of
+heavy history reads (/api/user/sessions) and a student chatting (/api/chat) at the
+same time, and reports throughput plus chat latency. When DB work blocks the event loop, chat
+latency climbs to the duration of the slowest query in flight.
+
+Usage (from the backend directory):
+    python benchmarks/bench_async_db.py --sessions 300 --concurrency 20 --rounds 5
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import _common
+from _common import pct
+
+_common.bootstrap()
+
+import httpx
+import database_config
+import main
+from database_models import UserSession, Assessment
+
+
+def seed(history_sessions: int):
+    """Create one student with a long reading history"""
+    database_config.create_tables()
+    db = database_config.SessionLocal()
+    for story_id in range(1, 4):
+        _common.add_story(db, story_id=story_id, title=f"Story {story_id}")
+    user, = _common.add_students(db, 1)
+
+    started = datetime.utcnow() - timedelta(days=history_sessions)
+    for i in range(history_sessions):
+        session = UserSession(
+            user_id=user.id, story_id=i % 3 + 1, current_scene_index=2, scenes_completed=3,
+            quiz_started=True, quiz_completed=True, quiz_score=80.0, total_reading_time=120,
+            started_at=started + timedelta(days=i), completed_at=started + timedelta(days=i, minutes=5),
+            is_completed=True
+        )
+        db.add(session)
+        db.flush()
+        for q in range(5):
+            db.add(Assessment(
+                user_id=user.id, session_id=session.id, question_index=q, question_text=f"Question {q}",
+                user_answer_index=1, user_answer_text="b", correct_answer_index=1, is_correct=True,
+                points_earned=1
+            ))
+    db.commit()
+    db.close()
+
+
+async def _timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(args):
+    seed(args.sessions)
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            login = await client.post("/auth/login", json={"username": "bench0", "password": "bench"})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            chat_body = {"message": "What is the moral?", "context": {}}
+
+            history_times, chat_times = [], []
+
+            async def chat_probe(done: asyncio.Event):
+                # A student chatting while others load their history. The clock starts
+                # when the message is due, so time spent waiting for a blocked loop counts.
+                while not done.is_set():
+                    due = time.perf_counter() + 0.01
+                    await asyncio.sleep(0.01)
+                    await _timed(client, "POST", "/api/chat", headers=headers, json=chat_body)
+                    chat_times.append(time.perf_counter() - due)
+
+            wall_start = time.perf_counter()
+            for _ in range(args.rounds):
+                done = asyncio.Event()
+                probe = asyncio.create_task(chat_probe(done))
+                heavy = [_timed(client, "GET", "/api/user/sessions", headers=headers)
+                         for _ in range(args.concurrency)]
+                history_times.extend(await asyncio.gather(*heavy))
+                done.set()
+                await probe
+            wall = time.perf_counter() - wall_start
+
+    total = len(history_times) + len(chat_times)
+
+    print("=" * 60)
+    print(f"History sessions: {args.sessions}  Concurrency: {args.concurrency}  Rounds: {args.rounds}")
+    print(f"Throughput:       {total / wall:.1f} req/s ({total} requests in {wall:.2f}s)")
+    print(f"/api/user/sessions p50 {pct(history_times, 0.5):.1f} ms  p95 {pct(history_times, 0.95):.1f} ms")
+    print(f"/api/chat          p50 {pct(chat_times, 0.5):.1f} ms  p95 {pct(chat_times, 0.95):.1f} ms  "
+          f"max {max(chat_times) * 1000:.1f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Database concurrency benchmark")
+    parser.add_argument("--sessions", type=int, default=300, help="sessions in the student's history")
+    parser.add_argument("--concurrency", type=int, default=20, help="parallel history requests per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark
+Simulates a class logging in at the start of a lesson: many POST /auth/login calls at
+once (httpx ASGI transport, no network) while one student is already chatting. Reports
+logins per second and the chat latency measured from when each message is due, which
+shows whether bcrypt is blocking the event loop.
+
+Usage (from the backend directory):
+    python benchmarks/bench_login.py --students 30 --concurrency 30
+    BCRYPT_ROUNDS=10 PASSWORD_HASH_WORKERS=8 python benchmarks/bench_login.py
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import _common
+from _common import pct
+
+_common.bootstrap()
+
+import httpx
+import database_config
+import main
+
+
+def seed(students: int):
+    """Create the class"""
+    database_config.create_tables()
+    db = database_config.SessionLocal()
+    _common.add_students(db, students)
+    db.close()
+
+
+async def run(args):
+    seed(args.students)
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            login = await client.post("/auth/login", json={"username": "bench0", "password": "bench"})
+            chat_headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            chat_body = {"message": "What is the moral?", "context": {}}
+            login_times, chat_times = [], []
+
+            async def chat_probe(done: asyncio.Event):
+                # The clock starts when the message is due, so time spent waiting for a blocked loop counts
+                while not done.is_set():
+                    due = time.perf_counter() + 0.01
+                    await asyncio.sleep(0.01)
+                    await client.post("/api/chat", headers=chat_headers, json=chat_body)
+                    chat_times.append(time.perf_counter() - due)
+
+            queue = [f"bench{i % args.students}" for i in range(args.logins or args.students)]
+
+            async def worker():
+                while queue:
+                    username = queue.pop()
+                    start = time.perf_counter()
+                    response = await client.post("/auth/login", json={"username": username, "password": "bench"})
+                    response.raise_for_status()
+                    login_times.append(time.perf_counter() - start)
+
+            done = asyncio.Event()
+            probe = asyncio.create_task(chat_probe(done))
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            wall = time.perf_counter() - wall_start
+            done.set()
+            await probe
+
+    print("=" * 60)
+    print(f"Logins: {len(login_times)}  Concurrency: {args.concurrency}  "
+          f"BCRYPT_ROUNDS: {os.getenv('BCRYPT_ROUNDS', 'default')}")
+    print(f"Throughput:  {len(login_times) / wall:.1f} logins/s ({wall:.2f}s)")
+    print(f"/auth/login  p50 {pct(login_times, 0.5):.1f} ms  p95 {pct(login_times, 0.95):.1f} ms")
+    print(f"/api/chat    p50 {pct(chat_times, 0.5):.1f} ms  p95 {pct(chat_times, 0.95):.1f} ms  "
+          f"max {max(chat_times) * 1000:.1f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--logins", type=int, default=0, help="total logins (default: one per student)")
+    parser.add_argument("--concurrency", type=int, default=30, help="logins in flight at once")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the pure-Python hot paths
+Times each function the way pytest-benchmark does (calibrated inner loop, many rounds,
+min/median/mean/stddev) and compares it with the JSON baseline checked in at
+benchmarks/baselines/micro.json, so a change that slows a hot path shows up in review.
+
+Absolute timings depend on the machine and on how busy it is, so the baseline doesn't store
+them: every benchmark is recorded as its min divided by the min of a fixed reference operation
+timed in the same run (before and after the benchmarks, to catch the machine slowing down
+midway). Only those ratios are compared.
+
+Usage (from the backend directory):
+    python benchmarks/bench_micro.py                 # compare with the baseline
+    python benchmarks/bench_micro.py --strict        # ...and exit with status 1 on a regression
+    python benchmarks/bench_micro.py --save          # record a new baseline
+    python benchmarks/bench_micro.py -k streak       # only benchmarks whose name contains "streak"
+
+A benchmark whose ratio grew by more than --max-regression percent is flagged. That is advisory
+unless --strict is given, since a single run on a noisy machine can still be off.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# main is imported for its helpers; keep it away from the real database
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+logging.disable(logging.CRITICAL)
+
+import activity_calendar
+import main
+from ai_service import AIService
+from auth_utils import create_access_token, verify_token
+from services.chat_service_mock import TutorChatService
+from services.response_cache import tutor_response_cache
+
+BASELINE_PATH = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "micro.json")
+
+# Interpreter-bound work with no app code in it: JSON round trip, comprehension, dict and string ops
+_REFERENCE_PAYLOAD = {"id": 7, "title": "Reference", "scores": list(range(40)), "tags": ["a", "b", "c"]}
+
+
+def _reference_op():
+    data = json.loads(json.dumps(_REFERENCE_PAYLOAD))
+    counts = {}
+    for score in data["scores"]:
+        counts[score % 7] = counts.get(score % 7, 0) + score
+    return ",".join(f"{key}:{value}" for key, value in sorted(counts.items()))
+
+
+def _repeat(fn, *args):
+    """Turn a single call into a 'run n times' callable"""
+    def run(n):
+        for _ in range(n):
+            fn(*args)
+    return run
+
+
+def _repeat_async(coro_fn, *args):
+    """Run n awaits inside one event loop, so loop start-up isn't part of the measurement"""
+    loop = asyncio.new_event_loop()
+
+    async def many(n):
+        for _ in range(n):
+            await coro_fn(*args)
+
+    def run(n):
+        loop.run_until_complete(many(n))
+    return run
+
+
+def reference_benchmark():
+    return _repeat(_reference_op)
+
+
+def build_benchmarks():
+    """name -> callable(n) running the hot path n times"""
+    random.seed(42)
+    benchmarks = {}
+
+    ai_service = AIService()
+    questions = [{"question": f"Question {i}?", "options": ["a", "b", "c", "d"], "correct": i % 4} for i in range(5)]
+    answers = {i: (i + 1) % 4 if i == 2 else i % 4 for i in range(5)}
+    benchmarks["ai_service.generate_quiz_feedback"] = _repeat(
+        ai_service.generate_quiz_feedback, questions, answers, 80.0)
+
+    chat = TutorChatService()
+    context = {"currentStory": {"title": "The Honest Woodcutter", "theme": "honesty"},
+               "userProgress": {"level": "Beginner"}}
+    messages = ["What is the moral of this story?", "Why did the woodcutter tell the truth?",
+                "hello", "Can you explain the ending?", "I don't understand the second scene"]
+
+    async def chat_round():
+        tutor_response_cache.clear()
+        for message in messages:
+            await chat.get_tutor_response(message, "bench", context)
+    benchmarks["chat_mock.get_tutor_response_x5"] = _repeat_async(chat_round)
+
+    async def cached_chat_round():
+        for message in messages:
+            await chat.get_tutor_response(message, "bench", context)
+    benchmarks["chat_mock.get_tutor_response_cached_x5"] = _repeat_async(cached_chat_round)
+
+    reading_times = [5, 59, 60, 61, 754, 3599, 3600, 7385, 86399]
+    benchmarks["main._format_reading_time_x9"] = _repeat(
+        lambda: [main._format_reading_time(seconds) for seconds in reading_times])
+
+    # Five years of history with ~80% of days active, ending today with a 30-day run
+    today = date.today()
+    days = [today - timedelta(days=offset) for offset in range(5 * 365)
+            if offset < 30 or random.random() < 0.8]
+    calendar = activity_calendar.from_dates(days)
+    benchmarks["activity_calendar.current_streak_5y"] = _repeat(activity_calendar.current_streak, calendar, today)
+    benchmarks["activity_calendar.longest_streak_5y"] = _repeat(activity_calendar.longest_streak, calendar)
+    benchmarks["activity_calendar.from_dates_5y"] = _repeat(activity_calendar.from_dates, days)
+
+    token = create_access_token({"sub": "bench", "uid": 1}, timedelta(minutes=30))
+    benchmarks["auth.create_access_token"] = _repeat(
+        create_access_token, {"sub": "bench", "uid": 1}, timedelta(minutes=30))
+    benchmarks["auth.verify_token"] = _repeat(verify_token, token)
+    return benchmarks
+
+
+def measure(run, rounds: int, min_round_seconds: float):
+    """Calibrate iterations per round, then time `rounds` rounds; returns per-call seconds"""
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        run(iterations)
+        if time.perf_counter() - start >= min_round_seconds:
+            break
+        iterations *= 2
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run(iterations)
+        samples.append((time.perf_counter() - start) / iterations)
+    return {
+        "min_us": round(min(samples) * 1e6, 3),
+        "median_us": round(statistics.median(samples) * 1e6, 3),
+        "mean_us": round(statistics.mean(samples) * 1e6, 3),
+        "stddev_us": round(statistics.stdev(samples) * 1e6, 3) if len(samples) > 1 else 0.0,
+        "rounds": rounds,
+        "iterations": iterations,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for hot functions")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("-k", dest="keyword", help="only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--min-round-ms", type=float, default=10.0)
+    parser.add_argument("--max-regression", type=float, default=25.0, help="percent growth of a ratio that is flagged")
+    parser.add_argument("--strict", action="store_true", help="exit with status 1 when a benchmark is flagged")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("benchmarks", {})
+
+    benchmarks = {name: run for name, run in build_benchmarks().items()
+                  if not args.keyword or args.keyword in name}
+    min_round_seconds = args.min_round_ms / 1000
+    reference = reference_benchmark()
+    reference_before = measure(reference, args.rounds, min_round_seconds)["min_us"]
+    stats_by_name = {name: measure(run, args.rounds, min_round_seconds) for name, run in benchmarks.items()}
+    reference_us = min(reference_before, measure(reference, args.rounds, min_round_seconds)["min_us"])
+
+    results, regressions = {}, []
+    print(f"reference op: {reference_us:.2f} us")
+    print(f"{'benchmark':<42} {'min us':>10} {'median us':>10} {'stddev':>9} {'x ref':>8} {'vs baseline':>12}")
+    for name, stats in stats_by_name.items():
+        ratio = stats["min_us"] / reference_us
+        results[name] = {"ratio": round(ratio, 4)}
+        change = ""
+        if "ratio" in baseline.get(name, {}):
+            delta = (ratio / baseline[name]["ratio"] - 1) * 100
+            change = f"{delta:+.1f}%"
+            if delta > args.max_regression:
+                regressions.append(name)
+                change += " !"
+        print(f"{name:<42} {stats['min_us']:>10.2f} {stats['median_us']:>10.2f} {stats['stddev_us']:>9.2f} "
+              f"{ratio:>8.3f} {change:>12}")
+
+    if args.save:
+        merged = dict(baseline)
+        merged.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "unit": "min time / min time of the reference op in the same run",
+                "benchmarks": dict(sorted(merged.items()))
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print(f"Slower than baseline by more than {args.max_regression:.0f}%: {', '.join(regressions)}")
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Load test for quiz submission
+Drives POST /api/sessions/{id}/submit_quiz in-process (httpx ASGI transport, no network)
+with many students finishing a story at once, and reports submissions per second plus
+latency. Every submission writes assessments, progress, daily activity and achievements,
+so the number is dominated by how many statements and commits (fsyncs) each one costs.
+
+Usage (from the backend directory):
+    python benchmarks/bench_quiz_submit.py --students 20 --submissions 400 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import time
+
+import _common
+from _common import pct
+
+_common.bootstrap()
+
+import httpx
+import database_config
+import main
+from database_models import UserSession
+
+QUESTIONS = 5
+
+
+def seed(students: int, submissions: int):
+    """Create the students and enough finished-reading sessions for every submission"""
+    database_config.create_tables()
+    db = database_config.SessionLocal()
+    _common.add_story(db, story_id=1, questions=QUESTIONS)
+    users = _common.add_students(db, students)
+
+    sessions = {user.username: [] for user in users}
+    for i in range(submissions):
+        user = users[i % students]
+        session = UserSession(user_id=user.id, story_id=1, current_scene_index=2, scenes_completed=3,
+                              total_reading_time=90)
+        db.add(session)
+        db.flush()
+        sessions[user.username].append(session.id)
+    db.commit()
+    db.close()
+    return sessions
+
+
+async def run(args):
+    sessions = seed(args.students, args.submissions)
+    answers = {str(i): (1 if i % 2 == 0 else 0) for i in range(QUESTIONS)}
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            headers = {}
+            for username in sessions:
+                login = await client.post("/auth/login", json={"username": username, "password": "bench"})
+                headers[username] = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            # Each worker plays one student submitting their quizzes back to back
+            queue = [(username, session_id) for username, ids in sessions.items() for session_id in ids]
+            latencies, errors = [], []
+
+            async def worker():
+                while queue:
+                    username, session_id = queue.pop()
+                    start = time.perf_counter()
+                    response = await client.post(
+                        f"/api/sessions/{session_id}/submit_quiz", headers=headers[username],
+                        json={"session_id": session_id, "quiz_answers": answers, "total_quiz_time_seconds": 30}
+                    )
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            wall = time.perf_counter() - wall_start
+
+    print("=" * 60)
+    print(f"Students: {args.students}  Submissions: {args.submissions}  Concurrency: {args.concurrency}")
+    print(f"Throughput: {len(latencies) / wall:.1f} submissions/s ({len(latencies)} in {wall:.2f}s)")
+    print(f"Latency:    p50 {pct(latencies, 0.5):.1f} ms  p95 {pct(latencies, 0.95):.1f} ms  "
+          f"max {max(latencies) * 1000:.1f} ms")
+    if errors:
+        print(f"Errors:     {len(errors)} ({sorted(set(errors))})")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quiz submission load test")
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--submissions", type=int, default=400, help="total quizzes submitted")
+    parser.add_argument("--concurrency", type=int, default=20, help="submissions in flight at once")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+SQLite read/write mix benchmark
+Runs a classroom's worth of students in-process (httpx ASGI transport, no network): each
+one alternates writes (complete_scene / submit_quiz) with reads (dashboard, history), so
+writers and readers contend for the database file. Reports operations per second, read
+and write latency, and how many requests failed (e.g. "database is locked").
+
+Compare the production profile with SQLite's defaults (from the backend directory):
+    python benchmarks/bench_sqlite_profile.py --students 20 --stories 10
+    SQLITE_PRODUCTION_PROFILE=false python benchmarks/bench_sqlite_profile.py --students 20 --stories 10
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+import _common
+from _common import pct
+
+_common.bootstrap(log_level=logging.CRITICAL)
+
+import httpx
+import database_config
+import main
+
+ANSWERS = {str(i): 1 for i in range(5)}
+
+
+def seed(students: int):
+    database_config.create_tables()
+    db = database_config.SessionLocal()
+    _common.add_story(db, story_id=1)
+    _common.add_students(db, students)
+    db.close()
+
+
+async def run(args):
+    seed(args.students)
+    reads, writes, failures = [], [], []
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+
+            async def timed(bucket, method, url, **kwargs):
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, url, **kwargs)
+                except Exception as e:  # The ASGI transport re-raises unhandled app errors
+                    failures.append(f"{type(e).__name__}: {str(e).splitlines()[0]}")
+                    return None
+                bucket.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    failures.append(f"{response.status_code} {url}")
+                return response
+
+            async def login(index: int):
+                response = await client.post("/auth/login", json={"username": f"bench{index}", "password": "bench"})
+                return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            async def student(headers):
+                for _ in range(args.stories):
+                    session = await timed(writes, "POST", "/api/sessions", headers=headers, json={"story_id": 1})
+                    if session is None or session.status_code != 200:
+                        continue
+                    session_id = session.json()["id"]
+                    for scene in range(3):
+                        await timed(writes, "POST", f"/api/sessions/{session_id}/complete_scene", headers=headers,
+                                    json={"scene_index": scene, "reading_time_seconds": 30})
+                        await timed(reads, "GET", "/api/dashboard", headers=headers)
+                    await timed(writes, "POST", f"/api/sessions/{session_id}/submit_quiz", headers=headers,
+                                json={"quiz_answers": ANSWERS, "total_quiz_time_seconds": 20})
+                    await timed(reads, "GET", "/api/user/sessions", headers=headers)
+
+            # Log everyone in first so bcrypt time stays out of the measurement
+            logins = [await login(i) for i in range(args.students)]
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(student(headers) for headers in logins))
+            wall = time.perf_counter() - wall_start
+
+    total = len(reads) + len(writes)
+    profile = os.getenv("SQLITE_PRODUCTION_PROFILE", "true")
+    print("=" * 60)
+    print(f"Students: {args.students}  Stories each: {args.stories}  Production profile: {profile}")
+    print(f"Throughput: {total / wall:.1f} ops/s ({len(reads)} reads, {len(writes)} writes in {wall:.2f}s)")
+    print(f"Reads:      p50 {pct(reads, 0.5):.1f} ms  p95 {pct(reads, 0.95):.1f} ms")
+    print(f"Writes:     p50 {pct(writes, 0.5):.1f} ms  p95 {pct(writes, 0.95):.1f} ms")
+    print(f"Failures:   {len(failures)}" + (f" (e.g. {failures[0]})" if failures else ""))
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite read/write mix benchmark")
+    parser.add_argument("--students", type=int, default=20, help="students working concurrently")
+    parser.add_argument("--stories", type=int, default=10, help="stories each student reads")
+    asyncio.run(run(parser.parse_args()))
@@ -1,23 +1,157 @@
 
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 from contextlib import contextmanager
+from db_instrumentation import instrument_engine
 
 # Database URL - can be overridden with environment variable
 DATABASE_URL = os.getenv(
-    "DATABASE_URL", 
+    "DATABASE_URL",
     "sqlite:///./storytelling_tutor.db"
 )
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL, echo=True)
+def _to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url[len("postgresql+psycopg2:"):]
+    if url.startswith("postgresql:"):
+        return "postgresql+asyncpg:" + url[len("postgresql:"):]
+    if url.startswith("postgres:"):
+        return "postgresql+asyncpg:" + url[len("postgres:"):]
+    return url
+
+# Async URL used by the API - can be overridden independently
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _to_async_url(DATABASE_URL))
+
+# Production SQLite profile - pragmas applied to every new connection plus a pooled async engine.
+# Set SQLITE_PRODUCTION_PROFILE=false for SQLite's defaults, or a single pragma to "" to leave it alone.
+SQLITE_PRODUCTION_PROFILE = os.getenv("SQLITE_PRODUCTION_PROFILE", "true").lower() in ("1", "true", "yes")
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),  # Readers no longer block behind writers
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),  # fsync at checkpoints, not every commit
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),  # Wait for the write lock instead of failing
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # Negative = KiB, i.e. 64 MB
+}
+# SQLite has a single writer, so a small pool queues writers first-in first-out
+# instead of letting many connections spin on the busy timeout
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "5"))
+# With WAL, readers never wait for the writer - read-only requests get their own, larger pool
+# so they don't queue behind writers for one of the SQLITE_POOL_SIZE connections
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "10"))
+
+def _is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+# Connection pool for server databases (Postgres) - size it per worker process:
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections per engine, times the number of workers
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Replace connections older than this (seconds)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Server-side cap on any single statement (0 disables)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+def _server_pool_options(url: str) -> dict:
+    """Pool and per-connection settings for Postgres (or any non-SQLite database)"""
+    parsed = make_url(url)
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0 and parsed.get_backend_name() == "postgresql":
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+def _uses_sqlite_pool(url: str, is_async: bool) -> bool:
+    return is_async and SQLITE_PRODUCTION_PROFILE and _is_sqlite_file(url)
+
+def _pool_options(url: str, is_async: bool, sqlite_pool_size: int = SQLITE_POOL_SIZE) -> dict:
+    """Engine pool settings for the given database URL"""
+    if make_url(url).get_backend_name() != "sqlite":
+        return _server_pool_options(url)
+    if _uses_sqlite_pool(url, is_async):
+        # aiosqlite defaults to NullPool: a new connection (thread + pragmas) for every session
+        return {"poolclass": AsyncAdaptedQueuePool, "pool_size": sqlite_pool_size,
+                "max_overflow": 0, "pool_timeout": DB_POOL_TIMEOUT}
+    return {}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Connect-event listener applying SQLITE_PRAGMAS"""
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        if value:
+            cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def _apply_query_only(dbapi_connection, connection_record):
+    """Connect-event listener making a SQLite connection refuse writes"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+# Log every SQL statement - off by default; per-request counts come from db_instrumentation
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+
+# Create SQLAlchemy engine (sync - used by maintenance scripts)
+engine = create_engine(DATABASE_URL, echo=SQL_ECHO, **_pool_options(DATABASE_URL, is_async=False))
+
+# Create async engine (used by request handlers so queries don't block the event loop)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=SQL_ECHO, **_pool_options(ASYNC_DATABASE_URL, is_async=True))
+
+# Read-only async engine for handlers that never write. Only pooled SQLite gets a separate one
+# (query_only connections); everywhere else it is the same engine
+if _uses_sqlite_pool(ASYNC_DATABASE_URL, is_async=True):
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL, echo=SQL_ECHO,
+        **_pool_options(ASYNC_DATABASE_URL, is_async=True, sqlite_pool_size=SQLITE_READ_POOL_SIZE)
+    )
+else:
+    async_read_engine = async_engine
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if async_read_engine is not async_engine:
+    instrument_engine(async_read_engine.sync_engine)
+
+if SQLITE_PRODUCTION_PROFILE:
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    if async_read_engine is not async_engine:
+        event.listen(async_read_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        event.listen(async_read_engine.sync_engine, "connect", _apply_query_only)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create AsyncSessionLocal class - objects stay usable after commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Sessions for read-only handlers
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # Create Base class
 Base = declarative_base()
 
@@ -44,12 +178,31 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Dependency to get an async session for handlers that only read"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     """Create all database tables"""
     from database_models import Base
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully!")
 
+async def create_tables_async():
+    """Create all database tables through the async engine"""
+    from database_models import Base
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    print("Database tables created successfully!")
+
 def drop_tables():
     """Drop all database tables"""
     from database_models import Base
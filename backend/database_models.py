@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Date, Text, Boolean, ForeignKey, Float, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -53,6 +53,8 @@ class UserSession(Base):
     started_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)  # When quiz was completed
     is_completed = Column(Boolean, default=False)  # True when quiz is finished
+    quiz_feedback = Column(JSON, nullable=True)  # AI feedback on the quiz, once generated
+    feedback_status = Column(String(20), nullable=True)  # "pending" (deferred), "ready" or "fallback"
 
     # Relationships
     user = relationship("User", back_populates="sessions")
@@ -95,12 +97,18 @@ class UserProgress(Base):
     current_streak = Column(Integer, default=0)  # Days of consecutive activity
     longest_streak = Column(Integer, default=0)  # Longest streak ever achieved
     
+    # Running sums maintained on write so reads don't have to aggregate sessions
+    quiz_count = Column(Integer, default=0)  # Completed quizzes
+    quiz_score_sum = Column(Float, default=0.0)  # Sum of quiz scores (average = sum / count)
+    total_reading_seconds = Column(Integer, default=0)  # Reading time of completed sessions
+    
     # Category preferences and performance
     favorite_categories = Column(JSON)  # Array of preferred story categories
     category_scores = Column(JSON)  # Performance by category {"wisdom": 85, "social_skills": 92}
     
     # Activity tracking
     last_activity_date = Column(DateTime, default=datetime.utcnow)
+    activity_calendar = Column(JSON)  # {"2026": "<hex>"} - one bit per active day of each year
     last_completed_story_id = Column(Integer, ForeignKey("stories.id"), nullable=True)
     
     # Achievements/milestones
@@ -116,7 +124,8 @@ class DailyActivity(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    activity_date = Column(DateTime, nullable=False)  # Date of activity (no time)
+    activity_date = Column(DateTime, nullable=False)  # When the day's first activity happened
+    activity_day = Column(Date, nullable=False)  # Calendar day (UTC) - unique per user
     stories_completed = Column(Integer, default=0)  # Stories completed on this day
     scenes_read = Column(Integer, default=0)  # Scenes read on this day
     quiz_attempts = Column(Integer, default=0)  # Quiz attempts on this day
@@ -125,11 +134,23 @@ class DailyActivity(Base):
     # Relationships
     user = relationship("User")
 
+class ChatTurn(Base):
+    __tablename__ = "chat_turns"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)  # Chat user id as sent by the client
+    user_message = Column(Text, nullable=False)
+    assistant_message = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
 # Add indexes for better performance
 from sqlalchemy import Index
 
 # Indexes for common queries
 Index('idx_user_sessions_user_story', UserSession.user_id, UserSession.story_id)
+Index('idx_user_sessions_user_started', UserSession.user_id, UserSession.started_at, UserSession.id)
 Index('idx_assessments_session', Assessment.session_id)
 Index('idx_user_progress_user', UserProgress.user_id)
-Index('idx_daily_activity_user_date', DailyActivity.user_id, DailyActivity.activity_date)
+Index('uq_daily_activity_user_day', DailyActivity.user_id, DailyActivity.activity_day, unique=True)
+Index('idx_chat_turns_user_created', ChatTurn.user_id, ChatTurn.created_at, ChatTurn.id)
+Index('idx_chat_turns_created', ChatTurn.created_at)
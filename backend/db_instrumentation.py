@@ -0,0 +1,132 @@
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+logger = logging.getLogger(__name__)
+
+# Add X-DB-Queries / X-DB-Time-ms to every HTTP response
+DB_METRICS_HEADERS = os.getenv("DB_METRICS_HEADERS", "false").lower() in ("1", "true", "yes")
+# Warn when one statement shape runs more than this many times in a single request (0 disables)
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5"))
+
+
+class QueryStats:
+    """Statements executed on behalf of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements = Counter()
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the per-statement context, so a statement that raises leaves nothing behind
+    if _current_stats.get() is not None and context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = getattr(context, "_query_start_time", None)
+    if stats is None or started is None:
+        return
+    stats.count += 1
+    stats.total_seconds += time.perf_counter() - started
+    # Parameters are bound separately, so the SQL text is the statement's shape
+    stats.statements[statement] += 1
+
+
+def instrument_engine(engine: Engine):
+    """Count statements and time per request on a (sync) engine - pass async_engine.sync_engine for async"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        """ASGI middleware: collect QueryStats for each HTTP request, report them, flag N+1 patterns"""
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and DB_METRICS_HEADERS:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.total_seconds * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_stats.reset(token)
+            self._check_repeats(scope, stats)
+
+    def _check_repeats(self, scope, stats: QueryStats):
+        if DB_N_PLUS_ONE_THRESHOLD <= 0 or not stats.statements:
+            return
+        statement, times = stats.statements.most_common(1)[0]
+        if times > DB_N_PLUS_ONE_THRESHOLD:
+            logger.warning(
+                f"⚠️ Possible N+1: {scope['method']} {scope['path']} ran the same statement {times} times "
+                f"({stats.count} queries total): {' '.join(statement.split())[:200]}"
+            )
+
+
+def instrument_pool_checkout(engine: Engine, observe: Callable[[float], None]):
+    """Report how long each connection checkout took (queueing for a free connection and/or connecting)"""
+    _instrument_pool(engine.pool, observe)
+
+
+def _instrument_pool(pool: Pool, observe: Callable[[float], None]):
+    do_get = pool._do_get  # Pool.connect() -> _do_get() is where a checkout blocks
+    recreate = pool.recreate
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            observe(time.perf_counter() - start)
+
+    def instrumented_recreate():
+        # engine.dispose() swaps in pool.recreate(); the new pool must report too
+        new_pool = recreate()
+        _instrument_pool(new_pool, observe)
+        return new_pool
+
+    pool._do_get = timed_do_get
+    pool.recreate = instrumented_recreate
+
+
+def pool_status(engine: Engine) -> Dict[str, int]:
+    """Size and usage of an engine's pool (zeros for pools that don't keep connections, e.g. NullPool)"""
+    pool = engine.pool
+    stat = lambda name: getattr(pool, name)() if hasattr(pool, name) else 0
+    return {
+        "size": stat("size"),
+        "checked_out": stat("checkedout"),
+        "overflow": max(0, stat("overflow")),
+        "idle": stat("checkedin")
+    }
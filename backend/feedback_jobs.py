@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# "inline" generates quiz feedback before submit_quiz responds; "deferred" hands it to the workers
+QUIZ_FEEDBACK_MODE = os.getenv("QUIZ_FEEDBACK_MODE", "inline").lower()
+FEEDBACK_WORKERS = int(os.getenv("FEEDBACK_WORKERS", "2"))
+# Jobs waiting for a worker; when full, submit_quiz falls back to inline generation
+FEEDBACK_QUEUE_SIZE = int(os.getenv("FEEDBACK_QUEUE_SIZE", "200"))
+# Shutdown waits this long for queued jobs before abandoning them
+FEEDBACK_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("FEEDBACK_SHUTDOWN_TIMEOUT_SECONDS", "30"))
+# Feedback still pending after this long is treated as lost (its worker restarted) - quiz_results
+# then serves the fallback feedback
+FEEDBACK_PENDING_TIMEOUT_SECONDS = float(os.getenv("FEEDBACK_PENDING_TIMEOUT_SECONDS", "600"))
+
+
+class FeedbackJob:
+    """One quiz waiting for (or holding) its AI feedback"""
+
+    def __init__(self, session_id: int, user_id: int, generate_args: tuple, fallback: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.user_id = user_id
+        self.generate_args = generate_args
+        self.fallback = fallback
+        self.status = "pending"
+        self.feedback: Optional[Dict[str, Any]] = None
+
+
+class FeedbackJobQueue:
+    def __init__(self, workers: int = FEEDBACK_WORKERS, queue_size: int = FEEDBACK_QUEUE_SIZE):
+        """Background worker pool that generates quiz feedback off the request path"""
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._generate: Optional[Callable[..., Dict[str, Any]]] = None
+        self._on_done: Optional[Callable[[FeedbackJob], Awaitable[None]]] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, generate: Callable[..., Dict[str, Any]],
+                    on_done: Optional[Callable[[FeedbackJob], Awaitable[None]]] = None):
+        """Start the workers. `generate` is blocking and runs in a thread; `on_done` is awaited per job
+        and is where the feedback gets stored"""
+        self._generate = generate
+        self._on_done = on_done
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"🧵 Feedback worker pool started with {self.workers} workers")
+
+    async def stop(self):
+        """Let queued jobs finish (up to FEEDBACK_SHUTDOWN_TIMEOUT_SECONDS), then stop the workers"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), FEEDBACK_SHUTDOWN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping feedback workers before all jobs finished ({self._queue.qsize()} not started)")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, session_id: int, user_id: int, generate_args: tuple,
+               fallback: Dict[str, Any]) -> Optional[FeedbackJob]:
+        """Queue feedback for a graded quiz; returns None when the pool is stopped or full"""
+        if not self.running:
+            return None
+        job = FeedbackJob(session_id, user_id, generate_args, fallback)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.warning(f"Feedback queue full, generating feedback for session {session_id} inline")
+            return None
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": QUIZ_FEEDBACK_MODE,
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                job.feedback = await asyncio.to_thread(self._generate, *job.generate_args)
+                job.status = "ready"
+            except Exception as e:
+                logger.error(f"Error generating AI feedback for session {job.session_id}: {e}")
+                job.feedback = job.fallback
+                job.status = "fallback"
+            job.generate_args = ()
+
+            try:
+                if self._on_done:
+                    await self._on_done(job)
+            except Exception as e:
+                logger.error(f"Error delivering feedback for session {job.session_id}: {e}")
+            finally:
+                self._queue.task_done()  # Only now, so stop() also waits for the feedback to be stored
+
+
+# Create singleton instance
+feedback_jobs = FeedbackJobQueue()
@@ -1,5 +1,6 @@
 from database_config import get_db
 from database_models import Story
+from story_catalog import mark_catalog_stale
 import json
 from datetime import datetime
 
@@ -49,5 +50,6 @@ story = Story(
 
 db.add(story)
 db.commit()
+mark_catalog_stale()
 print("✅ Story added successfully!")
 db.close()
@@ -1,21 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, Response
+from fastapi import FastAPI, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, Response, Request, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, insert, update, case, or_, and_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
+import base64
 import json
 import logging
 import math
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Local imports
-from database_config import get_db, create_tables
+from database_config import (
+    get_async_db, get_async_read_db, create_tables_async, async_engine, async_read_engine, AsyncSessionLocal
+)
 from database_models import User, Story, UserSession, Assessment, UserProgress, DailyActivity
 from pydantic_schemas import (
     UserCreate, UserLogin, User as UserSchema, Token,
@@ -24,10 +33,17 @@ from pydantic_schemas import (
     UserStats, DashboardData, MessageResponse, ErrorResponse
 )
 from auth_utils import (
-    verify_password, get_password_hash, create_access_token, 
-    verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
+    get_password_hash_async, verify_and_update_password, create_access_token, 
+    verify_token, is_admin, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from ai_service import AIService
+from story_catalog import story_catalog, mark_catalog_stale
+from feedback_jobs import feedback_jobs, QUIZ_FEEDBACK_MODE, FEEDBACK_PENDING_TIMEOUT_SECONDS
+from user_cache import user_cache, snapshot_user
+from db_instrumentation import QueryStatsMiddleware, instrument_pool_checkout, pool_status
+import metrics
+import activity_calendar
+from services.response_cache import tutor_response_cache
 
 # Import the chat service with Gemini priority
 try:
@@ -50,7 +66,12 @@ except ImportError:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    create_tables()
+    await create_tables_async()
+    await story_catalog.load()
+    if CHAT_SERVICE_AVAILABLE:
+        await tutor_chat_service.conversation_history.start()
+    if QUIZ_FEEDBACK_MODE == "deferred":
+        await feedback_jobs.start(ai_service.generate_quiz_feedback, on_done=_finish_quiz_feedback)
     print("🚀 Interactive Storytelling Tutor API started successfully!")
     print("📖 New: 3-Scene Linear Stories + Quiz Format")
     print("⚡ Enhanced: Real-time Dashboard Updates")
@@ -59,7 +80,13 @@ async def lifespan(app: FastAPI):
     else:
         print("⚠️ Chat service is not available. Check services/chat_service_gemini.py")
     yield
-    # Shutdown (if needed in future)
+    # Shutdown
+    await feedback_jobs.stop()
+    if CHAT_SERVICE_AVAILABLE:
+        await tutor_chat_service.conversation_history.stop()  # Write out buffered chat turns
+    await async_engine.dispose()  # Close pooled connections (aiosqlite keeps a thread per connection)
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
     print("🛑 API shutting down...")
 
 # Create FastAPI app with lifespan
@@ -81,6 +108,29 @@ app.add_middleware(
     expose_headers=["*"]  # Add this line
 )
 
+# Per-request SQL query counts (X-DB-Queries / X-DB-Time-ms headers, N+1 warnings)
+app.add_middleware(QueryStatsMiddleware)
+
+# Route latency / in-flight metrics and DB pool stats for GET /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+instrument_pool_checkout(async_engine.sync_engine, metrics.DB_POOL_CHECKOUT.observe)
+if async_read_engine is not async_engine:
+    instrument_pool_checkout(async_read_engine.sync_engine, metrics.DB_POOL_CHECKOUT.observe)
+metrics.DB_POOL_SIZE.set_function(lambda: pool_status(async_engine.sync_engine)["size"])
+metrics.DB_POOL_CHECKED_OUT.set_function(lambda: pool_status(async_engine.sync_engine)["checked_out"])
+metrics.DB_POOL_OVERFLOW.set_function(lambda: pool_status(async_engine.sync_engine)["overflow"])
+
+@app.exception_handler(PoolTimeoutError)
+async def db_pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    """Every pooled connection stayed busy for DB_POOL_TIMEOUT - ask the client to retry"""
+    metrics.DB_POOL_TIMEOUTS.inc()
+    logger.warning(f"⚠️ Database pool exhausted on {request.method} {request.url.path}: {pool_status(async_engine.sync_engine)}, reads {pool_status(async_read_engine.sync_engine)}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please try again"},
+        headers={"Retry-After": "1"}
+    )
+
 # Security
 security = HTTPBearer()
 ai_service = AIService()
@@ -90,7 +140,7 @@ from pydantic import BaseModel
 
 class ChatMessage(BaseModel):
     message: str
-    user_id: str
+    user_id: Optional[str] = None  # Ignored: history is keyed by the authenticated user's id
     context: Dict[str, Any] = {}
 
 class ChatResponse(BaseModel):
@@ -114,6 +164,7 @@ class QuizResult(BaseModel):
     total_questions: int
     detailed_feedback: Dict[str, Any]
     achievement_unlocked: Optional[str] = None
+    feedback_job_id: Optional[str] = None  # Set when feedback is still being generated
 
 # WebSocket Connection Manager for real-time chat
 class ConnectionManager:
@@ -125,8 +176,9 @@ class ConnectionManager:
         self.active_connections[user_id] = websocket
         logging.info(f"User {user_id} connected to chat")
 
-    def disconnect(self, user_id: str):
-        if user_id in self.active_connections:
+    def disconnect(self, user_id: str, websocket: Optional[WebSocket] = None):
+        # A closing tab must not unregister the user's newer connection
+        if user_id in self.active_connections and websocket in (None, self.active_connections[user_id]):
             del self.active_connections[user_id]
             logging.info(f"User {user_id} disconnected from chat")
 
@@ -141,8 +193,12 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 # Dependency to get current user
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_read_db)):
     token = credentials.credentials
+    cached_user = user_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     token_data = verify_token(token)
     if token_data is None:
         raise HTTPException(
@@ -151,14 +207,36 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.query(User).filter(User.username == token_data["username"]).first()
-    if user is None:
+    if token_data["user_id"] is not None:
+        user = await db.get(User, token_data["user_id"])
+    else:
+        user = (await db.execute(
+            select(User).where(User.username == token_data["username"])
+        )).scalars().first()
+    if user is None or user.username != token_data["username"]:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user"
+        )
+
+    # Handlers only read the user, so later requests with this token can skip the lookup
+    user = snapshot_user(user)
+    user_cache.put(token, user, token_expires_at=token_data["expires_at"])
     return user
 
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    if not is_admin(current_user.username):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
 # Health check endpoints
 @app.get("/", response_model=MessageResponse)
 async def root():
@@ -173,16 +251,28 @@ async def health_check():
         "chat_mode": CHAT_MODE,
         "story_format": "3_scenes_plus_quiz",
         "realtime_support": True,
+        "db_pool": pool_status(async_engine.sync_engine),
+        "db_read_pool": pool_status(async_read_engine.sync_engine),
+        "chat_cache": tutor_response_cache.stats(),
+        "auth_cache": user_cache.stats(),
+        "chat_history": tutor_chat_service.conversation_history.stats() if CHAT_SERVICE_AVAILABLE else None,
         "version": "2.2.0"
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text-format metrics"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
 # ===============================
 # CHAT ENDPOINTS
 # ===============================
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat_with_tutor(chat_message: ChatMessage):
+async def chat_with_tutor(chat_message: ChatMessage, current_user: User = Depends(get_current_user)):
     """Main chat endpoint for AI tutor interaction"""
+    # Same key as /ws/chat/{user_id}, so both paths share one conversation per student
+    user_id = str(current_user.id)
     if not CHAT_SERVICE_AVAILABLE:
         raise HTTPException(
             status_code=503, 
@@ -192,38 +282,104 @@ async def chat_with_tutor(chat_message: ChatMessage):
     try:
         logger.info(f"📨 Received chat message:")
         logger.info(f"  - Message: '{chat_message.message}'")
-        logger.info(f"  - User ID: '{chat_message.user_id}'")
+        logger.info(f"  - User ID: '{user_id}'")
         
         context = chat_message.context if isinstance(chat_message.context, dict) else {}
         
+        chat_start = time.perf_counter()
         response_data = await tutor_chat_service.get_tutor_response(
             user_message=chat_message.message,
-            user_id=chat_message.user_id,
+            user_id=user_id,
             context=context
         )
+        chat_mode = response_data.get("mode", CHAT_MODE)
+        metrics.CHAT_LATENCY.observe(time.perf_counter() - chat_start, mode=chat_mode)
+        metrics.CHAT_RESPONSES.inc(mode=chat_mode)
         
         logger.info(f"✅ Successfully got response from tutor service")
         return ChatResponse(**response_data)
         
     except Exception as e:
         logger.error(f"❌ Chat endpoint error: {str(e)}", exc_info=True)
+        metrics.CHAT_RESPONSES.inc(mode="error")
         return ChatResponse(
             response="I apologize, but I encountered an error processing your request. Please try asking your question again in a different way.",
             suggestions=["Try asking about story themes", "Ask about character motivations", "Request help with lessons"],
-            user_id=chat_message.user_id,
+            user_id=user_id,
             timestamp=datetime.now().isoformat()
         )
 
+@app.websocket("/ws/chat/{user_id}")
+async def chat_websocket(websocket: WebSocket, user_id: str, token: str = Query(...)):
+    """Streaming chat over one persistent connection per tab.
+
+    Connect with ?token=<access token> for the same user. Send {"message": ..., "context": {...}};
+    the answer comes back as {"type": "chat_token", "text": ...} events while it is generated,
+    then {"type": "chat_done", ...} with the full response and suggestions. The connection also
+    receives pushed events such as quiz_feedback.
+    """
+    token_data = verify_token(token)
+    if token_data is None or str(token_data["user_id"]) != user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not CHAT_SERVICE_AVAILABLE:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    await manager.connect(websocket, user_id)
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                data = None  # Answered with chat_error below; the connection stays open
+            message = data.get("message") if isinstance(data, dict) else None
+            if not isinstance(message, str):
+                await websocket.send_json({"type": "chat_error", "detail": "Expected {\"message\": \"...\"}"})
+                continue
+            context = data.get("context") if isinstance(data.get("context"), dict) else {}
+
+            chat_start = time.perf_counter()
+            first_token_sent = False
+            try:
+                async for event in tutor_chat_service.stream_tutor_response(message, user_id, context):
+                    if not first_token_sent and event["type"] == "chat_token":
+                        first_token_sent = True
+                        first_token_seconds = time.perf_counter() - chat_start
+                    if event["type"] == "chat_done":
+                        chat_mode = event.get("mode", CHAT_MODE)
+                        metrics.CHAT_LATENCY.observe(time.perf_counter() - chat_start, mode=chat_mode)
+                        metrics.CHAT_RESPONSES.inc(mode=chat_mode)
+                        if first_token_sent:
+                            metrics.CHAT_FIRST_TOKEN.observe(first_token_seconds, mode=chat_mode)
+                    await websocket.send_json(event)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Chat stream error for user {user_id}: {str(e)}", exc_info=True)
+                metrics.CHAT_RESPONSES.inc(mode="error")
+                try:
+                    await websocket.send_json({
+                        "type": "chat_error",
+                        "detail": "I apologize, but I encountered an error processing your request. Please try again."
+                    })
+                except Exception:
+                    break  # The client is gone
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.disconnect(user_id, websocket)
+
 # ===============================
 # AUTHENTICATION ENDPOINTS
 # ===============================
 
 @app.post("/auth/signup", response_model=UserSchema)
-async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    existing_user = (await db.execute(
+        select(User).where((User.email == user_data.email) | (User.username == user_data.username))
+    )).scalars().first()
 
     if existing_user:
         raise HTTPException(
@@ -231,7 +387,7 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
             detail="Email or username already registered"
         )
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -240,31 +396,48 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     # Create user progress record
     progress = UserProgress(user_id=db_user.id)
     db.add(progress)
-    db.commit()
+    await db.commit()
 
     return db_user
 
 @app.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Authenticate user and return JWT token"""
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+    user = (await db.execute(
+        select(User).where(User.username == user_credentials.username)
+    )).scalars().first()
 
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    valid, new_hash = await verify_and_update_password(user_credentials.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # BCRYPT_ROUNDS changed since this hash was made - store one with the current cost
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    # Other tokens of this user re-read the row on their next request
+    user_cache.invalidate_user(user.id)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id}, expires_delta=access_token_expires
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
@@ -274,46 +447,40 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
 # ===============================
 
 @app.get("/api/stories", response_model=List[StoryList])
-async def get_stories(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_stories(request: Request, current_user: User = Depends(get_current_user)):
     """Get all available 3-scene stories"""
-    stories = db.query(Story).filter(Story.is_active == True).all()
-    return stories
+    await story_catalog.ensure_fresh()
+    return _conditional_json_response(request, story_catalog.list_json, story_catalog.list_etag)
 
 @app.get("/api/stories/{story_id}/scenes")
-async def get_story_scenes(story_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_story_scenes(story_id: int, request: Request, current_user: User = Depends(get_current_user)):
     """Get all 3 scenes for a story"""
-    story = db.query(Story).filter(Story.id == story_id, Story.is_active == True).first()
+    await story_catalog.ensure_fresh()
+    story = story_catalog.get(story_id)
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
     
-    # 🔧 FIX: Parse quiz data if it's a JSON string
-    quiz_data = json.loads(story.quiz) if isinstance(story.quiz, str) else story.quiz
-    scenes_data = json.loads(story.scenes) if isinstance(story.scenes, str) else story.scenes
-    
-    return {
-        "story_id": story.id,
-        "title": story.title,
-        "scenes": scenes_data,  # Array of 3 scenes
-        "total_scenes": story.total_scenes,
-        "quiz": quiz_data  # Array of quiz questions
-    }
+    # Scenes and quiz are parsed and serialized once when the catalog loads
+    return _conditional_json_response(request, story.scenes_json, story.scenes_etag)
 
 @app.get("/api/stories/{story_id}", response_model=StorySchema)
-async def get_story(story_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_story(story_id: int, request: Request, current_user: User = Depends(get_current_user)):
     """Get a specific story by ID with 3-scene format"""
-    story = db.query(Story).filter(Story.id == story_id, Story.is_active == True).first()
+    await story_catalog.ensure_fresh()
+    story = story_catalog.get(story_id)
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
-    return story
+    return _conditional_json_response(request, story.detail_json, story.detail_etag)
 
 # ===============================
 # SCENE-BASED SESSION ENDPOINTS
 # ===============================
 
 @app.post("/api/sessions", response_model=UserSessionSchema)
-async def start_story_session(session_data: SessionCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def start_story_session(session_data: SessionCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """Start a new 3-scene story session"""
-    story = db.query(Story).filter(Story.id == session_data.story_id, Story.is_active == True).first()
+    await story_catalog.ensure_fresh()
+    story = story_catalog.get(session_data.story_id)
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
 
@@ -329,8 +496,9 @@ async def start_story_session(session_data: SessionCreate, db: Session = Depends
     )
 
     db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+    await _bump_progress(db, current_user.id, total_sessions=1)
+    await db.commit()
+    await db.refresh(db_session)
 
     return db_session
 
@@ -338,14 +506,16 @@ async def start_story_session(session_data: SessionCreate, db: Session = Depends
 async def complete_scene(
     session_id: int, 
     scene_data: SceneCompletion,
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     current_user: User = Depends(get_current_user)
 ):
     """Mark a scene as completed and track progress"""
-    session = db.query(UserSession).filter(
-        UserSession.id == session_id,
-        UserSession.user_id == current_user.id
-    ).first()
+    session = (await db.execute(
+        select(UserSession).where(
+            UserSession.id == session_id,
+            UserSession.user_id == current_user.id
+        )
+    )).scalars().first()
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -364,10 +534,11 @@ async def complete_scene(
             # All 3 scenes completed, ready for quiz
             session.quiz_started = False  # Quiz not started yet
         
-        db.commit()
+        await _bump_progress(db, current_user.id, total_scenes_read=1)
         
         # Update daily activity
-        _update_daily_activity(current_user.id, scenes_read=1, db=db)
+        await _update_daily_activity(current_user.id, scenes_read=1, db=db)
+        await db.commit()
         
         return {
             "message": "Scene completed successfully",
@@ -382,14 +553,16 @@ async def complete_scene(
 async def submit_quiz(
     session_id: int,
     quiz_data: QuizSubmission,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Submit quiz answers and get results with AI feedback - FIXED VERSION"""
-    session = db.query(UserSession).filter(
-        UserSession.id == session_id,
-        UserSession.user_id == current_user.id
-    ).first()
+    session = (await db.execute(
+        select(UserSession).where(
+            UserSession.id == session_id,
+            UserSession.user_id == current_user.id
+        )
+    )).scalars().first()
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -403,18 +576,19 @@ async def submit_quiz(
         raise HTTPException(status_code=400, detail="Quiz already completed")
     
     # Get the story and quiz questions
-    story = db.query(Story).filter(Story.id == session.story_id).first()
+    await story_catalog.ensure_fresh()
+    story = story_catalog.get(session.story_id, active_only=False)
     if not story or not story.quiz:
         raise HTTPException(status_code=404, detail="Story or quiz not found")
     
-    # 🔧 CRITICAL FIX: Parse quiz data if it's a JSON string
-    quiz_questions = json.loads(story.quiz) if isinstance(story.quiz, str) else story.quiz
+    quiz_questions = story.quiz
     
     # Calculate score and generate feedback
     correct_answers = 0
     total_questions = len(quiz_questions)
     
-    # Process each answer and create assessment records
+    # Grade each answer; the assessment rows go in with one bulk INSERT below
+    assessment_rows = []
     for question_index, user_answer_index in quiz_data.quiz_answers.items():
         question_index = int(question_index)  # Ensure integer
         if question_index >= len(quiz_questions):
@@ -427,25 +601,27 @@ async def submit_quiz(
         if is_correct:
             correct_answers += 1
         
-        # Create assessment record
-        assessment = Assessment(
-            user_id=current_user.id,
-            session_id=session_id,
-            question_index=question_index,
-            question_text=question["question"],
-            user_answer_index=user_answer_index,
-            user_answer_text=question["options"][user_answer_index] if 0 <= user_answer_index < len(question["options"]) else "No answer",
-            correct_answer_index=correct_answer_index,
-            is_correct=is_correct,
-            points_earned=1 if is_correct else 0
-        )
-        
-        db.add(assessment)
+        assessment_rows.append({
+            "user_id": current_user.id,
+            "session_id": session_id,
+            "question_index": question_index,
+            "question_text": question["question"],
+            "user_answer_index": user_answer_index,
+            "user_answer_text": question["options"][user_answer_index] if 0 <= user_answer_index < len(question["options"]) else "No answer",
+            "correct_answer_index": correct_answer_index,
+            "is_correct": is_correct,
+            "points_earned": 1 if is_correct else 0,
+            "answered_at": datetime.utcnow()
+        })
+    
+    if assessment_rows:
+        await db.execute(insert(Assessment), assessment_rows)
     
     # Calculate final score
     score_percentage = (correct_answers / total_questions) * 100
     
     # 🔧 CRITICAL FIX: Properly mark session as completed
+    skipped_scenes = max(0, 3 - session.scenes_completed)
     session.scenes_completed = 3  # Set scenes as completed
     session.quiz_started = True
     session.quiz_completed = True
@@ -454,51 +630,59 @@ async def submit_quiz(
     session.completed_at = datetime.utcnow()
     session.total_reading_time += quiz_data.total_quiz_time_seconds
     
-    db.commit()
-    
-    # Generate AI feedback
-    try:
-        detailed_feedback = ai_service.generate_quiz_feedback(
-            quiz_questions,
-            quiz_data.quiz_answers,
-            score_percentage
-        )
-    except Exception as e:
-        logger.error(f"Error generating AI feedback: {e}")
-        detailed_feedback = {
-            "overall_feedback": f"Great job completing the quiz! You scored {score_percentage:.0f}%.",
-            "areas_to_improve": [],
-            "strengths": []
-        }
+    # Progress, daily activity and achievements join the same transaction
+    await _update_user_progress(
+        current_user.id, story.id, score_percentage,
+        reading_seconds=session.total_reading_time, skipped_scenes=skipped_scenes, db=db
+    )
+    await _update_daily_activity(current_user.id, stories_completed=1, quiz_attempts=1, db=db)
+    achievement = await _check_achievements(current_user.id, score_percentage, db=db)
     
-    # Update user progress
-    _update_user_progress(current_user.id, story.id, score_percentage, db=db)
+    # AI feedback is stored on the session - in deferred mode a worker fills it in after we answer
+    deferred = QUIZ_FEEDBACK_MODE == "deferred" and feedback_jobs.running
+    detailed_feedback = {}
+    if deferred:
+        session.feedback_status = "pending"
+    else:
+        detailed_feedback = _generate_quiz_feedback(session, quiz_questions, quiz_data.quiz_answers, score_percentage)
     
-    # Update daily activity
-    _update_daily_activity(current_user.id, stories_completed=1, quiz_attempts=1, db=db)
+    await db.commit()  # One commit for the whole submission
+    metrics.QUIZ_SUBMISSIONS.inc()
+    metrics.recent_quiz_submissions.add()
     
-    # Check for achievements
-    achievement = _check_achievements(current_user.id, score_percentage, db=db)
+    feedback_job = None
+    if deferred:
+        feedback_job = feedback_jobs.submit(
+            session_id, current_user.id,
+            (quiz_questions, quiz_data.quiz_answers, score_percentage),
+            fallback=_fallback_quiz_feedback(score_percentage)
+        )
+        if feedback_job is None:  # Queue full - generate it here after all
+            detailed_feedback = _generate_quiz_feedback(session, quiz_questions, quiz_data.quiz_answers, score_percentage)
+            await db.commit()
     
     return QuizResult(
         score=score_percentage,
         correct_answers=correct_answers,
         total_questions=total_questions,
         detailed_feedback=detailed_feedback,
-        achievement_unlocked=achievement
+        achievement_unlocked=achievement,
+        feedback_job_id=feedback_job.id if feedback_job else None
     )
 
 @app.get("/api/sessions/{session_id}/quiz_results")
 async def get_quiz_results(
     session_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get quiz results and feedback for a completed session"""
-    session = db.query(UserSession).filter(
-        UserSession.id == session_id,
-        UserSession.user_id == current_user.id
-    ).first()
+    session = (await db.execute(
+        select(UserSession).where(
+            UserSession.id == session_id,
+            UserSession.user_id == current_user.id
+        )
+    )).scalars().first()
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -507,9 +691,11 @@ async def get_quiz_results(
         raise HTTPException(status_code=400, detail="Quiz not completed yet")
 
     # Get all assessments for this session
-    assessments = db.query(Assessment).filter(Assessment.session_id == session_id).all()
+    assessments = (await db.execute(
+        select(Assessment).where(Assessment.session_id == session_id)
+    )).scalars().all()
 
-    return {
+    result = {
         "session_id": session_id,
         "quiz_score": session.quiz_score,
         "total_reading_time": session.total_reading_time,
@@ -517,6 +703,74 @@ async def get_quiz_results(
         "assessments": assessments
     }
 
+    # Deferred feedback is "pending" until a worker (on any API process) writes it to the session
+    if session.feedback_status is not None:
+        feedback_status, feedback = session.feedback_status, session.quiz_feedback
+        pending_since = datetime.utcnow() - session.completed_at
+        if feedback_status == "pending" and pending_since.total_seconds() > FEEDBACK_PENDING_TIMEOUT_SECONDS:
+            # The worker holding the job was restarted before it finished
+            feedback_status, feedback = "fallback", _fallback_quiz_feedback(session.quiz_score)
+        result["feedback_status"] = feedback_status
+        result["detailed_feedback"] = feedback
+
+    return result
+
+def _fallback_quiz_feedback(score_percentage: float) -> Dict[str, Any]:
+    """Feedback shown when AI generation fails"""
+    return {
+        "overall_feedback": f"Great job completing the quiz! You scored {score_percentage:.0f}%.",
+        "areas_to_improve": [],
+        "strengths": []
+    }
+
+def _generate_quiz_feedback(session: UserSession, quiz_questions, quiz_answers, score_percentage: float) -> Dict[str, Any]:
+    """Generate feedback inline and set it on the session (the caller commits)"""
+    try:
+        feedback = ai_service.generate_quiz_feedback(quiz_questions, quiz_answers, score_percentage)
+        feedback_status = "ready"
+    except Exception as e:
+        logger.error(f"Error generating AI feedback: {e}")
+        feedback, feedback_status = _fallback_quiz_feedback(score_percentage), "fallback"
+    session.quiz_feedback = feedback
+    session.feedback_status = feedback_status
+    return feedback
+
+async def _finish_quiz_feedback(job):
+    """Store a deferred job's feedback on its session, then push it to the student"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(UserSession).where(UserSession.id == job.session_id)
+            .values(quiz_feedback=job.feedback, feedback_status=job.status)
+        )
+        await db.commit()
+    await _push_quiz_feedback(job)
+
+async def _push_quiz_feedback(job):
+    """Send finished deferred feedback to the student if they have a socket open on this process;
+    clients connected elsewhere pick it up from quiz_results"""
+    await manager.send_personal_message(json.dumps({
+        "type": "quiz_feedback",
+        "feedback_job_id": job.id,
+        "session_id": job.session_id,
+        "status": job.status,
+        "detailed_feedback": job.feedback
+    }), str(job.user_id))
+
+# ===============================
+# CONDITIONAL GET HELPER
+# ===============================
+
+def _conditional_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Return 304 when the client already holds this ETag, otherwise the JSON body"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison per RFC 9110 - ignore any W/ prefix
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in candidates or etag in candidates:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # ===============================
 # ✅ NEW: SMART TIME FORMATTING HELPER
 # ===============================
@@ -544,7 +798,7 @@ def _format_reading_time(total_seconds: int) -> str:
 @app.get("/api/dashboard", response_model=DashboardData)
 async def get_dashboard(
     response: Response,
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_read_db), 
     current_user: User = Depends(get_current_user)
 ):
     """Get user dashboard data with 3-scene story metrics - REAL-TIME ENABLED"""
@@ -555,49 +809,23 @@ async def get_dashboard(
     response.headers["Expires"] = "0"
     response.headers["Access-Control-Allow-Headers"] = "Cache-Control"
     
-    # Get user progress
-    progress = db.query(UserProgress).filter(UserProgress.user_id == current_user.id).first()
-    if not progress:
-        progress = UserProgress(user_id=current_user.id)
-        db.add(progress)
-        db.commit()
-        db.refresh(progress)
-
-    # Get recent sessions
-    recent_sessions = db.query(UserSession).filter(
-        UserSession.user_id == current_user.id
-    ).order_by(UserSession.started_at.desc()).limit(5).all()
-
-    # Calculate real-time statistics
-    total_sessions = db.query(UserSession).filter(UserSession.user_id == current_user.id).count()
-    completed_stories = db.query(UserSession).filter(
-        UserSession.user_id == current_user.id,
-        UserSession.is_completed == True
-    ).count()
-
-    # Calculate reading time and average score
-    completed_sessions = db.query(UserSession).filter(
-        UserSession.user_id == current_user.id,
-        UserSession.quiz_completed == True
-    ).all()
-
+    # Counters are maintained by complete_scene / submit_quiz - this is a pure read
+    progress = await _get_progress_for_read(current_user.id, db)
+
+    # Get recent sessions together with their story titles
+    recent_sessions = (await db.execute(
+        select(UserSession, Story.title).outerjoin(
+            Story, Story.id == UserSession.story_id
+        ).where(
+            UserSession.user_id == current_user.id
+        ).order_by(UserSession.started_at.desc()).limit(5)
+    )).all()
+
+    completed_stories = progress.total_stories_completed
     # ✅ NEW: Use smart time formatting instead of just minutes
-    total_reading_seconds = sum(s.total_reading_time for s in completed_sessions)
-    total_reading_time_formatted = _format_reading_time(total_reading_seconds)
-    
-    avg_score = sum(s.quiz_score for s in completed_sessions if s.quiz_score) / len(completed_sessions) if completed_sessions else 0
-
-    # Calculate current streak
-    current_streak = _calculate_current_streak(current_user.id, db)
-
-    # Update progress record with real-time data
-    progress.total_stories_completed = completed_stories
-    progress.total_sessions = total_sessions
-    progress.average_quiz_score = avg_score
-    progress.total_reading_time = total_reading_seconds // 60  # Store as minutes in DB
-    progress.current_streak = current_streak
-    progress.last_activity_date = datetime.utcnow()
-    db.commit()
+    total_reading_time_formatted = _format_reading_time(progress.total_reading_seconds)
+    avg_score = progress.average_quiz_score
+    current_streak = _effective_streak(progress)
 
     # Create dashboard data - FIXED FORMAT FOR FRONTEND WITH SMART TIME
     dashboard_stats = {
@@ -609,12 +837,11 @@ async def get_dashboard(
 
     # Format recent sessions for frontend
     formatted_sessions = []
-    for s in recent_sessions:
-        story = db.query(Story).filter(Story.id == s.story_id).first()
-        if story:
+    for s, story_title in recent_sessions:
+        if story_title is not None:
             formatted_sessions.append({
                 "id": s.id,
-                "story_title": story.title,
+                "story_title": story_title,
                 "started_at": s.started_at.isoformat(),
                 "quiz_completed": s.quiz_completed,
                 "quiz_score": s.quiz_score,
@@ -635,30 +862,49 @@ async def get_dashboard(
 @app.get("/api/user/sessions")
 async def get_user_sessions(
     response: Response,
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all user sessions for ProgressPage and AssessmentCard - REAL-TIME"""
+    """Get user sessions for ProgressPage and AssessmentCard - REAL-TIME
+
+    Without `limit` the full history is returned. With `limit`, sessions are paged
+    newest-first on (started_at, id); pass the X-Next-Cursor header back as `cursor`.
+    """
     
     # Add no-cache headers for real-time updates
     response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     
-    # Get all user sessions with story details
-    sessions = db.query(UserSession).filter(
+    # Story and assessments are eager-loaded: 3 queries regardless of history length
+    query = select(UserSession).where(
         UserSession.user_id == current_user.id
-    ).order_by(UserSession.started_at.desc()).all()
+    ).options(
+        selectinload(UserSession.story),
+        selectinload(UserSession.assessments)
+    ).order_by(UserSession.started_at.desc(), UserSession.id.desc())
+    
+    if cursor:
+        cursor_started_at, cursor_id = _decode_session_cursor(cursor)
+        query = query.where(or_(
+            UserSession.started_at < cursor_started_at,
+            and_(UserSession.started_at == cursor_started_at, UserSession.id < cursor_id)
+        ))
+    if limit:
+        query = query.limit(limit + 1)
+    
+    sessions = (await db.execute(query)).scalars().all()
+    
+    if limit and len(sessions) > limit:
+        sessions = sessions[:limit]
+        response.headers["X-Next-Cursor"] = _encode_session_cursor(sessions[-1])
     
     formatted_sessions = []
     for session in sessions:
-        # Get story details
-        story = db.query(Story).filter(Story.id == session.story_id).first()
-        
-        # Get assessments for this session
-        assessments = db.query(Assessment).filter(
-            Assessment.session_id == session.id
-        ).all()
+        story = session.story
+        assessments = session.assessments
         
         formatted_sessions.append({
             "id": session.id,
@@ -692,7 +938,7 @@ async def get_user_sessions(
 @app.get("/api/user/progress")
 async def get_user_progress(
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get user progress data for ProgressPage - REAL-TIME"""
@@ -702,41 +948,8 @@ async def get_user_progress(
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     
-    # Get or create user progress record
-    progress = db.query(UserProgress).filter(UserProgress.user_id == current_user.id).first()
-    if not progress:
-        progress = UserProgress(user_id=current_user.id)
-        db.add(progress)
-        db.commit()
-        db.refresh(progress)
-    
-    # Calculate real-time statistics
-    total_sessions = db.query(UserSession).filter(UserSession.user_id == current_user.id).count()
-    completed_stories = db.query(UserSession).filter(
-        UserSession.user_id == current_user.id,
-        UserSession.is_completed == True
-    ).count()
-    
-    # Get all completed sessions for detailed stats
-    completed_sessions = db.query(UserSession).filter(
-        UserSession.user_id == current_user.id,
-        UserSession.quiz_completed == True
-    ).all()
-    
-    # ✅ NEW: Calculate with smart formatting
-    total_reading_seconds = sum(s.total_reading_time for s in completed_sessions)
-    avg_score = sum(s.quiz_score for s in completed_sessions if s.quiz_score) / len(completed_sessions) if completed_sessions else 0
-    total_scenes_read = sum(s.scenes_completed for s in db.query(UserSession).filter(UserSession.user_id == current_user.id).all())
-    
-    # Update progress record
-    progress.total_stories_completed = completed_stories
-    progress.total_sessions = total_sessions
-    progress.total_scenes_read = total_scenes_read
-    progress.average_quiz_score = avg_score
-    progress.total_reading_time = total_reading_seconds // 60  # Store as minutes in DB
-    progress.current_streak = _calculate_current_streak(current_user.id, db)
-    progress.last_activity_date = datetime.utcnow()
-    db.commit()
+    # Counters are maintained by complete_scene / submit_quiz - this is a pure read
+    progress = await _get_progress_for_read(current_user.id, db)
     
     return {
         "id": progress.id,
@@ -746,7 +959,7 @@ async def get_user_progress(
         "total_sessions": progress.total_sessions,
         "average_quiz_score": progress.average_quiz_score,
         "total_reading_time": progress.total_reading_time,
-        "current_streak": progress.current_streak,
+        "current_streak": _effective_streak(progress),
         "longest_streak": progress.longest_streak,
         "favorite_categories": progress.favorite_categories or [],
         "category_scores": progress.category_scores or {},
@@ -755,6 +968,27 @@ async def get_user_progress(
         "total_points": progress.total_points
     }
 
+@app.get("/api/user/activity_calendar")
+async def get_activity_calendar(
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the active days of a year for the calendar heatmap"""
+    today = datetime.utcnow().date()
+    year = year or today.year
+    progress = await _get_progress_for_read(current_user.id, db)
+    calendar = progress.activity_calendar
+    days = activity_calendar.active_days(calendar, year)
+    
+    return {
+        "year": year,
+        "active_days": [d.isoformat() for d in days],
+        "total_active_days": len(days),
+        "current_streak": activity_calendar.current_streak(calendar, today),
+        "longest_streak": activity_calendar.longest_streak(calendar)
+    }
+
 # ===============================
 # ASSESSMENTS ENDPOINTS FOR FRONTEND
 # ===============================
@@ -762,7 +996,7 @@ async def get_user_progress(
 @app.get("/api/user/assessments")
 async def get_user_assessments(
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get user's quiz history for AssessmentsPage - REAL-TIME"""
@@ -772,25 +1006,29 @@ async def get_user_assessments(
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     
-    # Get completed sessions with quiz results
-    completed_sessions = db.query(UserSession).filter(
-        UserSession.user_id == current_user.id,
-        UserSession.quiz_completed == True
-    ).order_by(UserSession.completed_at.desc()).all()
+    # Completed sessions plus their quiz results in one extra query; story title, category
+    # and quiz come from the catalog, so the stories' JSON columns are never loaded
+    completed_sessions = (await db.execute(
+        select(UserSession).where(
+            UserSession.user_id == current_user.id,
+            UserSession.quiz_completed == True
+        ).options(
+            selectinload(UserSession.assessments)
+        ).order_by(UserSession.completed_at.desc())
+    )).scalars().all()
     
     assessments = []
     for session in completed_sessions:
-        story = db.query(Story).filter(Story.id == session.story_id).first()
+        story = story_catalog.get(session.story_id, active_only=False)
         
         # Get detailed quiz results
-        quiz_assessments = db.query(Assessment).filter(
-            Assessment.session_id == session.id
-        ).order_by(Assessment.question_index).all()
+        quiz_assessments = sorted(session.assessments, key=lambda a: a.question_index)
+        
+        # The catalog holds every story's quiz already parsed
+        story_quiz = story.quiz if story else None
         
         quiz_details = []
-        if quiz_assessments and story and story.quiz:
-            # 🔧 FIX: Parse quiz data if it's a JSON string
-            story_quiz = json.loads(story.quiz) if isinstance(story.quiz, str) else story.quiz
+        if quiz_assessments and story_quiz:
             quiz_details = [
                 {
                     "question": assessment.question_text,
@@ -833,100 +1071,175 @@ async def get_user_assessments(
 # HELPER FUNCTIONS
 # ===============================
 
-def _update_user_progress(user_id: int, story_id: int, quiz_score: float, db: Session):
-    """Update user progress after completing a story"""
-    progress = db.query(UserProgress).filter(UserProgress.user_id == user_id).first()
-    if not progress:
-        progress = UserProgress(user_id=user_id)
-        db.add(progress)
+def _encode_session_cursor(session: UserSession) -> str:
+    """Encode the (started_at, id) keyset position of a session as an opaque cursor"""
+    raw = f"{session.started_at.isoformat()}|{session.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
-    progress.total_stories_completed += 1
-    progress.total_points += int(quiz_score)  # Add quiz score as points
-    progress.last_completed_story_id = story_id
-    
-    # Update average score
-    all_sessions = db.query(UserSession).filter(
-        UserSession.user_id == user_id,
-        UserSession.quiz_completed == True
-    ).all()
-    
-    if all_sessions:
-        avg_score = sum(s.quiz_score for s in all_sessions if s.quiz_score) / len(all_sessions)
-        progress.average_quiz_score = avg_score
-
-    db.commit()
+def _decode_session_cursor(cursor: str):
+    """Decode a cursor produced by _encode_session_cursor"""
+    try:
+        started_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(started_at), int(session_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _update_progress_row(db: AsyncSession, user_id: int, **values):
+    """UPDATE the user's UserProgress row, creating it first if the user doesn't have one yet"""
+    stmt = update(UserProgress).where(UserProgress.user_id == user_id).values(**values)
+    if (await db.execute(stmt)).rowcount:
+        return
+    # Rare path (e.g. users created before progress rows existed): insert a zeroed row, then apply
+    # the update to it. ON CONFLICT covers a concurrent request creating the same row.
+    dialect_insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    await db.execute(
+        dialect_insert(UserProgress).values(user_id=user_id).on_conflict_do_nothing(index_elements=[UserProgress.user_id])
+    )
+    await db.execute(stmt)
+
+async def _bump_progress(db: AsyncSession, user_id: int, **increments):
+    """Atomically add to UserProgress counters (col = col + n) without loading the row"""
+    values = {name: getattr(UserProgress, name) + amount for name, amount in increments.items()}
+    await _update_progress_row(db, user_id, **values)
+
+async def _update_user_progress(user_id: int, story_id: int, quiz_score: float, db: AsyncSession,
+                                reading_seconds: int = 0, skipped_scenes: int = 0):
+    """Update user progress after completing a story using running sums (caller commits)"""
+    await _update_progress_row(
+        db, user_id,
+        total_stories_completed=UserProgress.total_stories_completed + 1,
+        total_points=UserProgress.total_points + int(quiz_score),  # Add quiz score as points
+        last_completed_story_id=story_id,
+        total_scenes_read=UserProgress.total_scenes_read + skipped_scenes,
+        quiz_count=UserProgress.quiz_count + 1,
+        quiz_score_sum=UserProgress.quiz_score_sum + quiz_score,
+        # SET expressions see the pre-update row, so recompute from the old sums
+        average_quiz_score=(UserProgress.quiz_score_sum + quiz_score) / (UserProgress.quiz_count + 1),
+        total_reading_seconds=UserProgress.total_reading_seconds + reading_seconds,
+        total_reading_time=(UserProgress.total_reading_seconds + reading_seconds) // 60  # Minutes
+    )
 
-def _update_daily_activity(user_id: int, scenes_read: int = 0, stories_completed: int = 0, quiz_attempts: int = 0, db: Session = None):
-    """Update daily activity tracking"""
+async def _update_daily_activity(user_id: int, scenes_read: int = 0, stories_completed: int = 0, quiz_attempts: int = 0, db: AsyncSession = None):
+    """Update daily activity tracking with one atomic upsert on (user_id, activity_day) (caller commits)"""
     today = datetime.utcnow().date()
     
-    activity = db.query(DailyActivity).filter(
-        DailyActivity.user_id == user_id,
-        func.date(DailyActivity.activity_date) == today
-    ).first()
+    dialect_insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(DailyActivity).values(
+        user_id=user_id,
+        activity_date=datetime.utcnow(),
+        activity_day=today,
+        scenes_read=scenes_read,
+        stories_completed=stories_completed,
+        quiz_attempts=quiz_attempts,
+        total_time_minutes=0
+    )
+    # INSERT ... ON CONFLICT DO UPDATE: no read-then-insert race, no duplicate days
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyActivity.user_id, DailyActivity.activity_day],
+        set_={
+            "scenes_read": DailyActivity.scenes_read + stmt.excluded.scenes_read,
+            "stories_completed": DailyActivity.stories_completed + stmt.excluded.stories_completed,
+            "quiz_attempts": DailyActivity.quiz_attempts + stmt.excluded.quiz_attempts,
+        }
+    )
+    await db.execute(stmt)
+    
+    if scenes_read > 0 or stories_completed > 0:
+        await _record_active_day(user_id, today, db)
+
+async def _record_active_day(user_id: int, today, db: AsyncSession):
+    """Set today's bit in the user's activity calendar and refresh the stored streaks"""
+    progress = (await db.execute(
+        select(UserProgress).where(UserProgress.user_id == user_id)
+    )).scalars().first()
+    if not progress:
+        return
     
-    if not activity:
-        activity = DailyActivity(
-            user_id=user_id,
-            activity_date=datetime.utcnow(),
-            scenes_read=scenes_read,
-            stories_completed=stories_completed,
-            quiz_attempts=quiz_attempts
-        )
-        db.add(activity)
-    else:
-        activity.scenes_read += scenes_read
-        activity.stories_completed += stories_completed
-        activity.quiz_attempts += quiz_attempts
-    
-    db.commit()  # 🔧 FIXED: Added missing db.commit()
-
-def _calculate_current_streak(user_id: int, db: Session) -> int:
-    """Calculate current consecutive days of activity"""
-    activities = db.query(DailyActivity).filter(
-        DailyActivity.user_id == user_id
-    ).order_by(DailyActivity.activity_date.desc()).all()
-    
-    if not activities:
-        return 0
-    
-    streak = 0
-    current_date = datetime.utcnow().date()
-    
-    for activity in activities:
-        activity_date = activity.activity_date.date()
-        if activity_date == current_date or activity_date == current_date - timedelta(days=streak):
-            if activity.stories_completed > 0 or activity.scenes_read > 0:
-                streak += 1
-                current_date = activity_date - timedelta(days=1)
-        else:
-            break
+    if not activity_calendar.is_active(progress.activity_calendar, today):
+        progress.activity_calendar = activity_calendar.mark_day(progress.activity_calendar, today)
+        progress.current_streak = activity_calendar.current_streak(progress.activity_calendar, today)
+        progress.longest_streak = max(progress.longest_streak or 0, progress.current_streak)
+    progress.last_activity_date = datetime.utcnow()
+
+def _effective_streak(progress: UserProgress) -> int:
+    """Current streak as of today, from the activity bitmap (0 until the user is active today)"""
+    return activity_calendar.current_streak(progress.activity_calendar, datetime.utcnow().date())
+
+async def _get_progress_for_read(user_id: int, db: AsyncSession) -> UserProgress:
+    """Load the user's counter row; if it is missing, compute one without persisting it"""
+    progress = (await db.execute(
+        select(UserProgress).where(UserProgress.user_id == user_id)
+    )).scalars().first()
+    if progress:
+        return progress
+    
+    # One statement with conditional aggregates instead of loading every session
+    completed = UserSession.quiz_completed == True
+    stats = (await db.execute(
+        select(
+            func.count(UserSession.id),
+            func.coalesce(func.sum(case((UserSession.is_completed == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(UserSession.scenes_completed), 0),
+            func.coalesce(func.sum(case((completed, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((completed, UserSession.quiz_score), else_=0)), 0),
+            func.coalesce(func.sum(case((completed, UserSession.total_reading_time), else_=0)), 0)
+        ).where(UserSession.user_id == user_id)
+    )).one()
+    total_sessions, completed_stories, total_scenes_read, quiz_count, quiz_score_sum, total_reading_seconds = stats
+    calendar = await _load_activity_calendar(user_id, db)
+    current_streak = activity_calendar.current_streak(calendar, datetime.utcnow().date())
     
-    return streak
+    return UserProgress(
+        user_id=user_id,
+        total_stories_completed=completed_stories,
+        total_scenes_read=total_scenes_read,
+        total_sessions=total_sessions,
+        quiz_count=quiz_count,
+        quiz_score_sum=quiz_score_sum,
+        average_quiz_score=quiz_score_sum / quiz_count if quiz_count else 0,
+        total_reading_seconds=total_reading_seconds,
+        total_reading_time=total_reading_seconds // 60,
+        current_streak=current_streak,
+        longest_streak=activity_calendar.longest_streak(calendar),
+        activity_calendar=calendar,
+        total_points=0
+    )
 
-def _check_achievements(user_id: int, quiz_score: float, db: Session) -> Optional[str]:
-    """Check if user unlocked any achievements"""
-    progress = db.query(UserProgress).filter(UserProgress.user_id == user_id).first()
+async def _load_activity_calendar(user_id: int, db: AsyncSession) -> Dict[str, str]:
+    """Rebuild an activity bitmap from DailyActivity rows (fallback when no progress row exists)"""
+    activity_days = (await db.execute(
+        select(DailyActivity.activity_day).where(
+            DailyActivity.user_id == user_id,
+            or_(DailyActivity.stories_completed > 0, DailyActivity.scenes_read > 0)
+        )
+    )).scalars().all()
+    return activity_calendar.from_dates(activity_days)
+
+async def _check_achievements(user_id: int, quiz_score: float, db: AsyncSession) -> Optional[str]:
+    """Check if user unlocked any achievements (caller commits)"""
+    # Write pending calendar changes first so the refreshed row doesn't discard them
+    await db.flush()
+    progress = (await db.execute(
+        select(UserProgress).where(UserProgress.user_id == user_id)
+        .execution_options(populate_existing=True)
+    )).scalars().first()
     if not progress:
         return None
     
-    achievements = progress.achievements or []
+    achievements = list(progress.achievements or [])
     
     # Check for new achievements
     if quiz_score == 100 and "perfect_score" not in achievements:
         achievements.append("perfect_score")
         progress.achievements = achievements
-        db.commit()
         return "Perfect Score! 🌟"
     elif progress.current_streak >= 7 and "week_streak" not in achievements:
         achievements.append("week_streak")
         progress.achievements = achievements
-        db.commit()
         return "7-Day Reading Streak! 🔥"
     elif progress.total_stories_completed >= 3 and "story_master" not in achievements:  # FIXED: 3 stories
         achievements.append("story_master")
         progress.achievements = achievements
-        db.commit()
         return "Story Master! 📚"
     
     return None
@@ -935,15 +1248,27 @@ def _check_achievements(user_id: int, quiz_score: float, db: Session) -> Optiona
 # ADMIN ENDPOINTS
 # ===============================
 
+@app.post("/api/admin/stories/reload")
+async def reload_story_catalog(admin_user: User = Depends(get_admin_user)):
+    """Reload the story catalog after stories were edited - this worker now, every other worker
+    at its next stamp check"""
+    mark_catalog_stale()
+    await story_catalog.load()
+    return {
+        "message": "Story catalog reloaded",
+        "version": story_catalog.version,
+        "stories": len(story_catalog.stories)
+    }
+
 @app.get("/api/admin/stats")
-async def get_admin_stats(db: Session = Depends(get_db)):
+async def get_admin_stats(db: AsyncSession = Depends(get_async_read_db)):
     """Get overall platform statistics for 3-scene story format"""
-    total_users = db.query(User).count()
-    total_sessions = db.query(UserSession).count()
-    completed_stories = db.query(UserSession).filter(UserSession.is_completed == True).count()
-    total_scenes_read = db.query(UserSession).with_entities(
-        UserSession.scenes_completed
-    ).all()
+    total_users = (await db.execute(select(func.count()).select_from(User))).scalar()
+    total_sessions = (await db.execute(select(func.count()).select_from(UserSession))).scalar()
+    completed_stories = (await db.execute(
+        select(func.count()).select_from(UserSession).where(UserSession.is_completed == True)
+    )).scalar()
+    total_scenes_read = (await db.execute(select(UserSession.scenes_completed))).all()
     total_scenes = sum(s[0] for s in total_scenes_read if s[0])
 
     return {
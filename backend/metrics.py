@@ -0,0 +1,222 @@
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# In-process metrics rendered in the Prometheus text format by GET /metrics.
+# Everything is recorded from the event loop thread, so plain dicts are enough (no locks).
+
+_REGISTRY: List["_Metric"] = []
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._function = function
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the (unlabelled) value at scrape time instead of tracking it"""
+        self._function = function
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        if self._function is not None:
+            lines.append(f"{self.name} {_format_value(self._function())}")
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}  # key -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class RecentEvents:
+    def __init__(self, window_seconds: float = 60):
+        """Timestamps of recent events, for 'per minute' gauges"""
+        self.window_seconds = window_seconds
+        self._times = deque()
+
+    def add(self):
+        self._times.append(time.monotonic())
+
+    def count(self) -> int:
+        cutoff = time.monotonic() - self.window_seconds
+        while self._times and self._times[0] < cutoff:
+            self._times.popleft()
+        return len(self._times)
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ===============================
+# APPLICATION METRICS
+# ===============================
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests served", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served", ("method",))
+
+DB_POOL_CHECKOUT = Histogram("db_pool_checkout_seconds", "Time to obtain a database connection from the pool",
+                             buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0))
+DB_POOL_SIZE = Gauge("db_pool_size", "Connections kept by the async engine's pool")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Async engine connections currently in use")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Async engine connections open beyond pool_size")
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Requests rejected because no connection freed up in time")
+
+CHAT_LATENCY = Histogram("chat_provider_latency_seconds", "Tutor chat service latency", ("mode",))
+CHAT_RESPONSES = Counter("chat_responses_total", "Tutor chat responses by mode (gemini_ai_fallback = fallback)",
+                         ("mode",))
+CHAT_FIRST_TOKEN = Histogram("chat_first_token_seconds", "Time until the first streamed chat token was sent", ("mode",))
+TUTOR_CACHE_LOOKUPS = Counter("tutor_cache_lookups_total", "Tutor response cache lookups", ("result",))
+TUTOR_CACHE_ENTRIES = Gauge("tutor_cache_entries", "Tutor responses currently cached")
+AUTH_CACHE_LOOKUPS = Counter("auth_cache_lookups_total", "Authenticated-user cache lookups", ("result",))
+AUTH_CACHE_ENTRIES = Gauge("auth_cache_entries", "Verified tokens currently cached")
+
+PROVIDER_QUEUE_WAIT = Histogram("provider_queue_wait_seconds", "Time an upstream AI call waited for a free slot",
+                                ("provider",))
+PROVIDER_CALL_LATENCY = Histogram("provider_call_duration_seconds", "Time the AI provider took to answer, queueing excluded",
+                                  ("provider",))
+PROVIDER_PENDING = Gauge("provider_calls_pending", "Upstream AI calls waiting for a slot or running", ("provider",))
+PROVIDER_COALESCED = Counter("provider_calls_coalesced_total", "Requests that joined an identical call already in flight",
+                             ("provider",))
+PROVIDER_REJECTED = Counter("provider_calls_rejected_total", "Requests turned away because the provider queue was full",
+                            ("provider",))
+
+QUIZ_SUBMISSIONS = Counter("quiz_submissions_total", "Quizzes submitted")
+QUIZ_SUBMISSIONS_LAST_MINUTE = Gauge("quiz_submissions_last_minute", "Quizzes submitted in the last 60 seconds")
+recent_quiz_submissions = RecentEvents(60)
+QUIZ_SUBMISSIONS_LAST_MINUTE.set_function(recent_quiz_submissions.count)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        """ASGI middleware recording per-route latency, status counts and in-flight requests"""
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec(method=method)
+            # The route template (not the raw path) keeps label cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.observe(elapsed, method=method, route=route_path)
+            HTTP_REQUESTS.inc(method=method, route=route_path, status=str(status_code))
@@ -1,7 +1,9 @@
 import sqlite3
 import json
 import os
-from datetime import datetime
+from datetime import datetime, date
+import activity_calendar
+from story_catalog import mark_catalog_stale
 
 def migrate_database():
     """Migrate existing database to new 3-scene format"""
@@ -64,6 +66,7 @@ def migrate_database():
         # Commit changes
         conn.commit()
         conn.close()
+        mark_catalog_stale()
         
         print("✅ Database migration completed successfully!")
         return True
@@ -72,5 +75,203 @@ def migrate_database():
         print(f"❌ Migration failed: {e}")
         return False
 
+def migrate_progress_counters():
+    """Add the incremental UserProgress counters and backfill them from existing sessions"""
+    db_path = "storytelling_tutor.db"
+    
+    print("🔄 Migrating user progress counters...")
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("PRAGMA table_info(user_progress);")
+        columns = [row[1] for row in cursor.fetchall()]
+        
+        new_columns = {
+            "quiz_count": "INTEGER DEFAULT 0",
+            "quiz_score_sum": "FLOAT DEFAULT 0",
+            "total_reading_seconds": "INTEGER DEFAULT 0",
+            "activity_calendar": "JSON",
+        }
+        for name, ddl in new_columns.items():
+            if name not in columns:
+                print(f"➕ Adding '{name}' column to user_progress table...")
+                cursor.execute(f"ALTER TABLE user_progress ADD COLUMN {name} {ddl};")
+        
+        # Every user needs a counter row
+        cursor.execute("""
+            INSERT INTO user_progress (
+                user_id, total_stories_completed, total_scenes_read, total_sessions,
+                average_quiz_score, total_reading_time, current_streak, longest_streak, total_points
+            )
+            SELECT id, 0, 0, 0, 0, 0, 0, 0, 0 FROM users
+            WHERE id NOT IN (SELECT user_id FROM user_progress)
+        """)
+        
+        # Recompute every counter from the sessions table
+        cursor.execute("""
+            UPDATE user_progress SET
+                total_sessions = (SELECT COUNT(*) FROM user_sessions s
+                                  WHERE s.user_id = user_progress.user_id),
+                total_stories_completed = (SELECT COUNT(*) FROM user_sessions s
+                                           WHERE s.user_id = user_progress.user_id AND s.is_completed = 1),
+                total_scenes_read = (SELECT COALESCE(SUM(s.scenes_completed), 0) FROM user_sessions s
+                                     WHERE s.user_id = user_progress.user_id),
+                quiz_count = (SELECT COUNT(*) FROM user_sessions s
+                              WHERE s.user_id = user_progress.user_id AND s.quiz_completed = 1),
+                quiz_score_sum = (SELECT COALESCE(SUM(s.quiz_score), 0) FROM user_sessions s
+                                  WHERE s.user_id = user_progress.user_id AND s.quiz_completed = 1),
+                total_reading_seconds = (SELECT COALESCE(SUM(s.total_reading_time), 0) FROM user_sessions s
+                                         WHERE s.user_id = user_progress.user_id AND s.quiz_completed = 1)
+        """)
+        cursor.execute("""
+            UPDATE user_progress SET
+                average_quiz_score = CASE WHEN quiz_count > 0 THEN quiz_score_sum / quiz_count ELSE 0 END,
+                total_reading_time = total_reading_seconds / 60
+        """)
+        print(f"✅ Backfilled counters for {cursor.rowcount} users")
+        
+        # Activity bitmaps and streaks from the daily activity history
+        cursor.execute("""
+            SELECT user_id, DATE(activity_date) FROM daily_activity
+            WHERE stories_completed > 0 OR scenes_read > 0
+        """)
+        active_days = {}
+        for user_id, day in cursor.fetchall():
+            active_days.setdefault(user_id, []).append(date.fromisoformat(day))
+        
+        today = datetime.utcnow().date()
+        for user_id, days in active_days.items():
+            calendar = activity_calendar.from_dates(days)
+            cursor.execute(
+                "UPDATE user_progress SET activity_calendar = ?, current_streak = ?, longest_streak = ? WHERE user_id = ?",
+                (
+                    json.dumps(calendar),
+                    activity_calendar.current_streak(calendar, today),
+                    activity_calendar.longest_streak(calendar),
+                    user_id
+                )
+            )
+        print(f"✅ Built activity calendars for {len(active_days)} users")
+        
+        conn.commit()
+        conn.close()
+        
+        print("✅ Progress counter migration completed successfully!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+def migrate_daily_activity_days(batch_size: int = 1000):
+    """Add daily_activity.activity_day, backfill it in batches, merge duplicate days and make it unique"""
+    db_path = "storytelling_tutor.db"
+    
+    print("🔄 Migrating daily activity to date-keyed rows...")
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("PRAGMA table_info(daily_activity);")
+        columns = [row[1] for row in cursor.fetchall()]
+        if 'activity_day' not in columns:
+            print("➕ Adding 'activity_day' column to daily_activity table...")
+            cursor.execute("ALTER TABLE daily_activity ADD COLUMN activity_day DATE;")
+            conn.commit()
+        
+        # Backfill in small batches so writers are never locked out for long
+        backfilled = 0
+        while True:
+            cursor.execute("""
+                UPDATE daily_activity SET activity_day = DATE(activity_date)
+                WHERE id IN (SELECT id FROM daily_activity WHERE activity_day IS NULL LIMIT ?)
+            """, (batch_size,))
+            conn.commit()
+            if cursor.rowcount == 0:
+                break
+            backfilled += cursor.rowcount
+            print(f"  ✅ Backfilled {backfilled} rows")
+        
+        # Concurrent read-then-insert produced duplicate days: fold them into the oldest row
+        cursor.execute("""
+            SELECT user_id, activity_day, MIN(id), SUM(scenes_read), SUM(stories_completed),
+                   SUM(quiz_attempts), SUM(total_time_minutes)
+            FROM daily_activity
+            GROUP BY user_id, activity_day
+            HAVING COUNT(*) > 1
+        """)
+        duplicates = cursor.fetchall()
+        for user_id, day, keep_id, scenes, stories, quizzes, minutes in duplicates:
+            cursor.execute("""
+                UPDATE daily_activity
+                SET scenes_read = ?, stories_completed = ?, quiz_attempts = ?, total_time_minutes = ?
+                WHERE id = ?
+            """, (scenes, stories, quizzes, minutes, keep_id))
+            cursor.execute(
+                "DELETE FROM daily_activity WHERE user_id = ? AND activity_day = ? AND id != ?",
+                (user_id, day, keep_id)
+            )
+        print(f"🧹 Merged {len(duplicates)} duplicate days")
+        
+        cursor.execute("DROP INDEX IF EXISTS idx_daily_activity_user_date;")
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_activity_user_day
+            ON daily_activity (user_id, activity_day);
+        """)
+        
+        conn.commit()
+        conn.close()
+        
+        print("✅ Daily activity migration completed successfully!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+def migrate_quiz_feedback():
+    """Add the user_sessions columns that hold generated quiz feedback"""
+    db_path = "storytelling_tutor.db"
+    
+    print("🔄 Migrating quiz feedback columns...")
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("PRAGMA table_info(user_sessions);")
+        columns = [row[1] for row in cursor.fetchall()]
+        
+        new_columns = {
+            "quiz_feedback": "JSON",
+            "feedback_status": "VARCHAR(20)",
+        }
+        for name, ddl in new_columns.items():
+            if name not in columns:
+                print(f"➕ Adding '{name}' column to user_sessions table...")
+                cursor.execute(f"ALTER TABLE user_sessions ADD COLUMN {name} {ddl};")
+        
+        conn.commit()
+        conn.close()
+        
+        print("✅ Quiz feedback migration completed successfully!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
 if __name__ == "__main__":
-    migrate_database()
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--progress-counters":
+        migrate_progress_counters()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--daily-activity-days":
+        migrate_daily_activity_days()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--quiz-feedback":
+        migrate_quiz_feedback()
+    else:
+        migrate_database()
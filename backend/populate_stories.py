@@ -1,5 +1,6 @@
 from database_config import get_db
 from database_models import Story
+from story_catalog import mark_catalog_stale
 import json
 from datetime import datetime
 
@@ -257,6 +258,7 @@ def populate_stories():
         print(f"✅ Added: {story_data['title']}")
     
     db.commit()
+    mark_catalog_stale()
     print(f"\n🎉 Successfully added {len(stories_data)} stories to database!")
     db.close()
 
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from database_config import get_db_context, create_tables
 from database_models import User, Story, UserSession, Assessment, UserProgress
 from auth_utils import get_password_hash
+from story_catalog import mark_catalog_stale
 
 def load_sample_stories():
     """Load sample stories from JSON file"""
@@ -53,6 +54,7 @@ def seed_database():
 
             # Commit stories first
             db.commit()
+            mark_catalog_stale()
             print(f"✅ Added {len(stories_data['stories'])} sample stories")
 
         # Create demo users
@@ -142,6 +144,7 @@ def reset_database():
     from database_config import drop_tables
     drop_tables()
     create_tables()
+    mark_catalog_stale()
     print("✅ Database reset completed!")
 
 if __name__ == "__main__":
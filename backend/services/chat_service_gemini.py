@@ -1,14 +1,29 @@
 import google.generativeai as genai
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, List
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
 import asyncio
 
+from services.response_cache import cached_response, cache_key, tutor_response_cache
+from services.chat_streaming import stream_response
+from services.conversation_history import create_conversation_store
+from services.provider_executor import BoundedProviderExecutor, ProviderQueueFull
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Upstream Gemini calls allowed at once, and how many more may wait for a slot before
+# requests get the fallback answer straight away
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_QUEUE = int(os.getenv("GEMINI_MAX_QUEUE", "50"))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "10"))
+# Earlier exchanges included in the prompt, so follow-up questions keep their context
+GEMINI_HISTORY_TURNS = int(os.getenv("GEMINI_HISTORY_TURNS", "6"))
+
+gemini_executor = BoundedProviderExecutor("gemini", GEMINI_MAX_CONCURRENCY, GEMINI_MAX_QUEUE)
+
 class TutorChatService:
     def __init__(self):
         """Initialize Gemini-powered educational chat service with timeout protection"""
@@ -28,7 +43,7 @@ class TutorChatService:
             logger.error(f"Failed to initialize Gemini: {str(e)}")
             raise
         
-        self.conversation_history = {}
+        self.conversation_history = create_conversation_store()
         
     async def get_tutor_response(
         self, 
@@ -49,14 +64,23 @@ class TutorChatService:
                     context
                 )
             
+            history = await self.conversation_history.get(user_id)
+            key = self._shared_cache_key(user_message, context, history)
+            if key is not None:
+                cached = cached_response(key, user_id)
+                if cached is not None:
+                    self.conversation_history.append(user_id, user_message, cached["response"])
+                    return cached
+            
             # Build educational prompt
-            system_prompt = self._build_educational_prompt(context)
-            full_prompt = f"{system_prompt}\n\nStudent Question: {user_message}\n\nAI Tutor Response:"
+            full_prompt = self._build_full_prompt(context, history, user_message)
             
-            # Get Gemini response with timeout protection
+            # Get Gemini response with timeout protection (queueing for a slot counts towards it);
+            # students asking the same thing at the same time share one upstream call
             try:
                 response = await asyncio.wait_for(
-                    asyncio.to_thread(
+                    gemini_executor.run(
+                        full_prompt,
                         self.model.generate_content,
                         full_prompt,
                         generation_config=genai.types.GenerationConfig(
@@ -64,7 +88,7 @@ class TutorChatService:
                             temperature=0.7,
                         )
                     ),
-                    timeout=10.0  # 10 second timeout
+                    timeout=GEMINI_TIMEOUT_SECONDS
                 )
                 
                 ai_response = response.text.strip()
@@ -72,33 +96,95 @@ class TutorChatService:
             except asyncio.TimeoutError:
                 logger.warning(f"Gemini API timeout for user {user_id}")
                 return self._create_fallback_response(user_message, user_id, context)
+            except ProviderQueueFull:
+                logger.warning(f"Gemini queue full, answering user {user_id} with the fallback")
+                return self._create_fallback_response(user_message, user_id, context)
             except Exception as api_error:
                 logger.error(f"Gemini API error for user {user_id}: {str(api_error)}")
                 return self._create_fallback_response(user_message, user_id, context)
             
-            # Track conversation
-            if user_id not in self.conversation_history:
-                self.conversation_history[user_id] = []
-                
-            self.conversation_history[user_id].append({
-                "user": user_message,
-                "assistant": ai_response,
-                "timestamp": datetime.now().isoformat()
-            })
-            
-            return {
-                "response": ai_response,
-                "suggestions": self._generate_suggestions(context, user_message),
-                "user_id": user_id,
-                "timestamp": datetime.now().isoformat(),
-                "status": "success",
-                "mode": "gemini_ai"
-            }
+            response = self._create_ai_response(ai_response, user_message, user_id, context)
+            if key is not None:
+                tutor_response_cache.put(key, response)
+            return response
             
         except Exception as e:
             logger.error(f"Gemini service error for user {user_id}: {str(e)}")
             return self._create_fallback_response(user_message, user_id, context)
     
+    async def stream_tutor_response(
+        self,
+        user_message: str,
+        user_id: str,
+        context: Dict[str, Any] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream Gemini's answer as chat_token events while it is generated, then a chat_done event"""
+        if context is None:
+            context = {}
+        
+        if not user_message or not user_message.strip():
+            async for event in stream_response(await self.get_tutor_response(user_message, user_id, context)):
+                yield event
+            return
+        
+        history = await self.conversation_history.get(user_id)
+        key = self._shared_cache_key(user_message, context, history)
+        cached = cached_response(key, user_id) if key is not None else None
+        if cached is not None:
+            self.conversation_history.append(user_id, user_message, cached["response"])
+            async for event in stream_response(cached):
+                yield event
+            return
+        
+        full_prompt = self._build_full_prompt(context, history, user_message)
+        parts = []
+        try:
+            # Each chunk must arrive within the timeout, so time-to-first-token stays bounded
+            async for chunk in gemini_executor.stream(
+                self.model.generate_content,
+                full_prompt,
+                generation_config=genai.types.GenerationConfig(
+                    max_output_tokens=250,
+                    temperature=0.7,
+                ),
+                stream=True,
+                item_timeout=GEMINI_TIMEOUT_SECONDS
+            ):
+                text = chunk.text
+                if text:
+                    parts.append(text)
+                    yield {"type": "chat_token", "text": text}
+        except Exception as e:
+            reason = "timeout" if isinstance(e, asyncio.TimeoutError) else str(e) or type(e).__name__
+            logger.warning(f"Gemini stream for user {user_id} stopped after {len(parts)} chunks: {reason}")
+            if not parts:
+                async for event in stream_response(self._create_fallback_response(user_message, user_id, context)):
+                    yield event
+                return
+            # Keep the partial answer the student has already seen, but don't cache it
+            yield {"type": "chat_done", **self._create_ai_response("".join(parts).strip(), user_message, user_id, context)}
+            return
+        
+        response = self._create_ai_response("".join(parts).strip(), user_message, user_id, context)
+        if key is not None:
+            tutor_response_cache.put(key, response)
+        yield {"type": "chat_done", **response}
+    
+    def _create_ai_response(
+        self, ai_response: str, user_message: str, user_id: str, context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Record the exchange in the conversation history and build the success response"""
+        self.conversation_history.append(user_id, user_message, ai_response)
+        
+        return {
+            "response": ai_response,
+            "suggestions": self._generate_suggestions(context, user_message),
+            "user_id": user_id,
+            "timestamp": datetime.now().isoformat(),
+            "status": "success",
+            "mode": "gemini_ai"
+        }
+    
     def _create_fallback_response(
         self, user_message: str, user_id: str, context: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -142,6 +228,24 @@ class TutorChatService:
             "mode": "gemini_ai"
         }
     
+    def _shared_cache_key(self, user_message: str, context: Dict[str, Any], history: List[Dict[str, str]]):
+        """Response cache key, or None for follow-ups: an answer that depends on the conversation
+        so far isn't shared with the class"""
+        if history and GEMINI_HISTORY_TURNS > 0:
+            return None
+        return cache_key(user_message, context)
+    
+    def _build_full_prompt(self, context: Dict[str, Any], history: List[Dict[str, str]], user_message: str) -> str:
+        """Educational prompt, the student's recent exchanges (oldest first), then the new question"""
+        sections = [self._build_educational_prompt(context)]
+        recent = history[-GEMINI_HISTORY_TURNS:] if GEMINI_HISTORY_TURNS > 0 else []
+        if recent:
+            sections.append("RECENT CONVERSATION:\n" + "\n".join(
+                f"Student: {turn['user']}\nAI Tutor: {turn['assistant']}" for turn in recent
+            ))
+        sections.append(f"Student Question: {user_message}\n\nAI Tutor Response:")
+        return "\n\n".join(sections)
+    
     def _build_educational_prompt(self, context: Dict[str, Any]) -> str:
         """Build educational prompt for Gemini"""
         story = context.get('currentStory', {})
@@ -183,10 +287,7 @@ Response should be educational, encouraging, and directly answer the student's q
     
     def clear_conversation_history(self, user_id: str) -> bool:
         """Clear conversation history"""
-        if user_id in self.conversation_history:
-            del self.conversation_history[user_id]
-            return True
-        return False
+        return self.conversation_history.clear(user_id)
     
     def health_check(self) -> Dict[str, Any]:
         """Health check with timeout protection"""
@@ -203,6 +304,8 @@ Response should be educational, encouraging, and directly answer the student's q
                 "mode": "gemini_ai",
                 "model": "gemini-1.5-flash",
                 "message": "Gemini AI ready for tutoring! 🚀",
+                "provider_executor": gemini_executor.stats(),
+                "conversation_history": self.conversation_history.stats(),
                 "timestamp": datetime.now().isoformat()
             }
         except Exception as e:
@@ -211,6 +314,7 @@ Response should be educational, encouraging, and directly answer the student's q
                 "mode": "gemini_ai_fallback",
                 "error": str(e),
                 "message": "Gemini AI with fallback protection active",
+                "conversation_history": self.conversation_history.stats(),
                 "timestamp": datetime.now().isoformat()
             }
 
@@ -1,16 +1,79 @@
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, List, Optional
 from datetime import datetime
 import logging
 import random
 import re
 
+from services.response_cache import cached_tutor_response
+from services.chat_streaming import stream_response
+from services.conversation_history import create_conversation_store
+
 logger = logging.getLogger(__name__)
 
+# Intent table in priority order: when a message matches several intents, the first listed wins.
+# Keywords match anywhere in the lower-cased message (plain substring semantics).
+INTENT_KEYWORDS = [
+    ("real_world", ["real life", "apply", "school", "bullies", "everyday", "family", "bully"]),
+    ("tortoise", ["tortoise"]),
+    ("hare", ["hare", "rabbit"]),
+    ("character_motivation", ["character", "motivation", "why"]),
+    ("moral", ["moral", "lesson", "teach", "learn", "meaning"]),
+    ("greeting", ["hello", "hi", "hey", "greetings"]),
+]
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex alternation shaped like a trie, so shared prefixes are only tried once"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def _compile_intents(table):
+    """Compile the intent table into one regex plus keyword -> priority rank"""
+    ranks = {}
+    for rank, (_, keywords) in enumerate(table):
+        for keyword in keywords:
+            ranks.setdefault(keyword, rank)
+    # The regex reports the longest keyword starting at a position; a shorter keyword that is
+    # its prefix matched there too, so the longer one inherits the better rank of the two
+    for keyword in ranks:
+        ranks[keyword] = min(rank for other, rank in ranks.items() if keyword.startswith(other))
+    return re.compile(_trie_pattern(list(ranks))), ranks
+
+
+_INTENT_PATTERN, _KEYWORD_RANKS = _compile_intents(INTENT_KEYWORDS)
+
+
+def classify_intent(message_lower: str) -> Optional[str]:
+    """Top-priority intent of a lower-cased message in one scan, or None"""
+    best = len(INTENT_KEYWORDS)
+    search = _INTENT_PATTERN.search
+    match = search(message_lower)
+    while match and best:
+        best = min(best, _KEYWORD_RANKS[match.group()])
+        # Restart one character later, so keywords overlapping this match are still seen
+        match = search(message_lower, match.start() + 1)
+    return INTENT_KEYWORDS[best][0] if best < len(INTENT_KEYWORDS) else None
+
+
 class TutorChatService:
     def __init__(self):
         """Initialize comprehensive AI-like mock chat service with 4 stories"""
-        self.conversation_history = {}
+        self.conversation_history = create_conversation_store()
         self.story_database = self._build_story_database()
         logger.info("🎭 Advanced AI-like Mock TutorChatService initialized with 4 stories!")
         
@@ -44,7 +107,8 @@ class TutorChatService:
                     "Little friends may prove to be great friends", 
                     "Don't judge others by their size or appearance",
                     "Everyone has something valuable to offer"
-                ]
+                ],
+                "real_life": "When dealing with bullies at school, remember the mouse's courage - stand up for what's right, seek help when needed, and don't let size or status intimidate you. In friendships, be like both characters - show kindness like the lion and loyalty like the mouse. At home, help family members regardless of how small the task might seem. These timeless lessons help us build better relationships, show compassion, and create positive change in our world. How might you use these lessons in your current situation?"
             },
             
             "The Tortoise and the Hare": {
@@ -80,7 +144,8 @@ class TutorChatService:
                     "Overconfidence can lead to defeat",
                     "Persistence pays off in the end",
                     "Don't underestimate others based on appearances"
-                ]
+                ],
+                "real_life": "In school, steady studying beats cramming at the last minute - be like the tortoise with consistent effort. When facing bullies or challenges, remember that persistence often wins over raw talent. Don't give up on difficult subjects; steady progress leads to success. Avoid being overconfident like the hare - always do your best even when tasks seem easy. These lessons help you succeed through determination rather than talent alone. What area of your life could benefit from more tortoise-like persistence?"
             },
             
             "The Boy Who Cried Wolf": {
@@ -116,7 +181,8 @@ class TutorChatService:
                     "Honesty is the foundation of trust",
                     "Actions have consequences",
                     "Responsibility should be taken seriously"
-                ]
+                ],
+                "real_life": "In school and friendships, always tell the truth - people need to trust you when it really matters. When you're tempted to lie or exaggerate for attention, remember the shepherd boy's consequences. At home, be honest with family members even when it's difficult. In emergencies, people must be able to believe you. These lessons about honesty help build strong, trusting relationships that last a lifetime. How can you practice being more trustworthy in your daily interactions?"
             },
             
             "The Ant and the Grasshopper": {
@@ -146,10 +212,12 @@ class TutorChatService:
                     "Hard work and planning pay off",
                     "Play has its time, but work must come first",
                     "Those who don't prepare will face difficulties"
-                ]
+                ],
+                "real_life": "In school, do your homework regularly instead of playing all the time - prepare like the ant. Save money for things you want instead of spending everything immediately. Help with chores at home to prepare for adult responsibilities. Study for tests in advance rather than cramming. Balance fun with responsibility so you're ready when challenges come. These lessons about preparation help you succeed in school and life. How can you better balance fun and preparation in your daily routine?"
             }
         }
         
+    @cached_tutor_response
     async def get_tutor_response(
         self, 
         user_message: str, 
@@ -184,47 +252,46 @@ class TutorChatService:
             "mode": "smart_mock"
         }
     
+    async def stream_tutor_response(
+        self,
+        user_message: str,
+        user_id: str,
+        context: Dict[str, Any] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the answer as chat_token events in word-sized chunks, then a chat_done event"""
+        response = await self.get_tutor_response(user_message, user_id, context)
+        async for event in stream_response(response):
+            yield event
+    
     def _generate_intelligent_response(self, message_lower: str, original_message: str,
                                      story_title: str, story_theme: str, user_level: str) -> str:
         """Generate contextually appropriate response to ANY question - ENHANCED FOR ALL STORIES"""
         
-        story_data = self.story_database.get(story_title, {})
+        intent = classify_intent(message_lower)
         
-        # 1. REAL-WORLD APPLICATION QUESTIONS (Check this FIRST - highest priority)
-        if any(word in message_lower for word in ['real life', 'apply', 'school', 'bullies', 'everyday', 'family', 'bully']):
-            if story_title == "The Boy Who Cried Wolf":
-                return f"What a practical and important question! 🌍 The lessons from '{story_title}' apply beautifully to real life! In school and friendships, always tell the truth - people need to trust you when it really matters. When you're tempted to lie or exaggerate for attention, remember the shepherd boy's consequences. At home, be honest with family members even when it's difficult. In emergencies, people must be able to believe you. These lessons about honesty help build strong, trusting relationships that last a lifetime. How can you practice being more trustworthy in your daily interactions?"
-            elif story_title == "The Tortoise and the Hare":
-                return f"What a practical and important question! 🌍 The lessons from '{story_title}' apply beautifully to real life! In school, steady studying beats cramming at the last minute - be like the tortoise with consistent effort. When facing bullies or challenges, remember that persistence often wins over raw talent. Don't give up on difficult subjects; steady progress leads to success. Avoid being overconfident like the hare - always do your best even when tasks seem easy. These lessons help you succeed through determination rather than talent alone. What area of your life could benefit from more tortoise-like persistence?"
-            elif story_title == "The Ant and the Grasshopper":
-                return f"What a practical and important question! 🌍 The lessons from '{story_title}' apply beautifully to real life! In school, do your homework regularly instead of playing all the time - prepare like the ant. Save money for things you want instead of spending everything immediately. Help with chores at home to prepare for adult responsibilities. Study for tests in advance rather than cramming. Balance fun with responsibility so you're ready when challenges come. These lessons about preparation help you succeed in school and life. How can you better balance fun and preparation in your daily routine?"
-            else:  # The Lion and the Mouse
-                return f"What a practical and important question! 🌍 The lessons from '{story_title}' apply beautifully to real life! When dealing with bullies at school, remember the mouse's courage - stand up for what's right, seek help when needed, and don't let size or status intimidate you. In friendships, be like both characters - show kindness like the lion and loyalty like the mouse. At home, help family members regardless of how small the task might seem. These timeless lessons help us build better relationships, show compassion, and create positive change in our world. How might you use these lessons in your current situation?"
+        # 1. REAL-WORLD APPLICATION QUESTIONS (highest priority)
+        if intent == "real_world":
+            story_data = self.story_database.get(story_title) or self.story_database["The Lion and the Mouse"]
+            return f"What a practical and important question! 🌍 The lessons from '{story_title}' apply beautifully to real life! {story_data['real_life']}"
         
         # 2. STORY-SPECIFIC CHARACTER QUESTIONS
-        if any(word in message_lower for word in ['tortoise', 'hare', 'rabbit']):
-            if 'tortoise' in message_lower:
-                return f"The Tortoise is an inspiring character! 🐢✨ What makes the tortoise special is his steady determination and humble confidence. He doesn't boast or show off - he simply believes in himself and keeps moving forward. The tortoise teaches us that success isn't about being the fastest or most talented; it's about consistency, persistence, and never giving up. His wisdom shows us that small, steady steps can lead to great victories. The tortoise proves that patience and perseverance can overcome any obstacle. What can you learn from the tortoise's approach to challenges?"
-            elif 'hare' in message_lower or 'rabbit' in message_lower:
-                return f"The Hare is a fascinating character study! 🐰 He represents natural talent and speed, but also the dangers of overconfidence. The hare's mistake wasn't being fast - it was assuming that talent alone was enough to win. He became lazy and careless because he underestimated his opponent. The hare teaches us that no matter how gifted we are, we must still work hard and respect others. His character shows us how pride can lead to downfall, and why humility and effort are essential for success. How can you avoid the hare's mistakes in your own life?"
+        if intent == "tortoise":
+            return f"The Tortoise is an inspiring character! 🐢✨ What makes the tortoise special is his steady determination and humble confidence. He doesn't boast or show off - he simply believes in himself and keeps moving forward. The tortoise teaches us that success isn't about being the fastest or most talented; it's about consistency, persistence, and never giving up. His wisdom shows us that small, steady steps can lead to great victories. The tortoise proves that patience and perseverance can overcome any obstacle. What can you learn from the tortoise's approach to challenges?"
+        if intent == "hare":
+            return f"The Hare is a fascinating character study! 🐰 He represents natural talent and speed, but also the dangers of overconfidence. The hare's mistake wasn't being fast - it was assuming that talent alone was enough to win. He became lazy and careless because he underestimated his opponent. The hare teaches us that no matter how gifted we are, we must still work hard and respect others. His character shows us how pride can lead to downfall, and why humility and effort are essential for success. How can you avoid the hare's mistakes in your own life?"
         
         # 3. CHARACTER MOTIVATION QUESTIONS
-        if any(word in message_lower for word in ['character', 'motivation', 'why']):
+        if intent == "character_motivation":
             return f"Excellent question about character motivations! 🎭 In '{story_title}', each character is driven by different desires and needs. Understanding what motivates characters helps us understand ourselves and others better. Characters act based on their values, fears, hopes, and experiences - just like real people do. Whether it's the lion's initial pride, the mouse's determination to help, the tortoise's quiet confidence, or the shepherd boy's desire for attention - each motivation teaches us something important about human nature and the choices we make. What specific character motivation would you like to explore further?"
         
         # 4. MORAL/LESSON QUESTIONS
-        if any(word in message_lower for word in ['moral', 'lesson', 'teach', 'learn', 'meaning']):
-            moral_lessons = {
-                "The Lion and the Mouse": "No act of kindness, however small, is ever wasted",
-                "The Tortoise and the Hare": "Slow and steady wins the race",
-                "The Boy Who Cried Wolf": "Nobody believes a liar, even when they are telling the truth", 
-                "The Ant and the Grasshopper": "It is best to prepare for the days of necessity"
-            }
-            moral = moral_lessons.get(story_title, "Every story teaches us important life lessons")
+        if intent == "moral":
+            morals = self.story_database.get(story_title, {}).get("morals")
+            moral = morals[0] if morals else "Every story teaches us important life lessons"
             return f"Such an insightful question about life lessons! 💡 The main moral of '{story_title}' is: '{moral}' This story teaches us profound lessons about character, relationships, responsibility, and making good choices. These lessons apply beautifully to our daily lives and help us become better people. When we understand and apply these teachings, we can navigate challenges more successfully and build stronger relationships with others. How might you apply these lessons in your own life?"
         
         # 5. GREETING RESPONSES
-        if any(word in message_lower for word in ['hello', 'hi', 'hey', 'greetings']) and len(message_lower.split()) <= 3:
+        if intent == "greeting" and len(message_lower.split()) <= 3:
             return f"Hello! 👋 I'm your AI tutor, excited to explore stories with you! As a {user_level} learner, what aspect of storytelling would you like to discuss? Whether it's characters, themes, or life lessons, I'm here to help you discover deeper meanings! 🌟"
         
         # 6. FALLBACK FOR ANY OTHER QUESTION
@@ -270,10 +337,7 @@ class TutorChatService:
     
     def clear_conversation_history(self, user_id: str) -> bool:
         """Clear conversation history"""
-        if user_id in self.conversation_history:
-            del self.conversation_history[user_id]
-            return True
-        return False
+        return self.conversation_history.clear(user_id)
     
     def health_check(self) -> Dict[str, Any]:
         """Health check"""
@@ -297,6 +361,7 @@ class TutorChatService:
                 "Emotional intelligence development",
                 "Story-specific responses"
             ],
+            "conversation_history": self.conversation_history.stats(),
             "timestamp": datetime.now().isoformat()
         }
 
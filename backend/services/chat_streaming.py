@@ -0,0 +1,21 @@
+import asyncio
+import re
+from typing import Any, AsyncIterator, Dict, List
+
+# Streamed answers are sent as {"type": "chat_token", "text": ...} events while the answer is being
+# produced, then one {"type": "chat_done", ...} event carrying the full tutor response.
+
+_WORD_CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+def chunk_text(text: str) -> List[str]:
+    """Split a finished answer into word-sized chunks (whitespace kept, so the chunks join back exactly)"""
+    return _WORD_CHUNK.findall(text)
+
+
+async def stream_response(response: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Stream an already complete response (canned, cached or fallback) like a provider would"""
+    for chunk in chunk_text(response["response"]):
+        yield {"type": "chat_token", "text": chunk}
+        await asyncio.sleep(0)  # Let each frame go out instead of queueing the whole answer at once
+    yield {"type": "chat_done", **response}
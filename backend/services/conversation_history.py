@@ -0,0 +1,333 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+
+from database_models import ChatTurn
+
+logger = logging.getLogger(__name__)
+
+# "memory" keeps history inside this worker; "database" shares it between workers through the
+# app database (chat_turns table), written behind the chat response in batches
+CHAT_HISTORY_BACKEND = os.getenv("CHAT_HISTORY_BACKEND", "memory").lower()
+# Per-user chat history is kept for context only: the last few turns of recently active users
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "20"))
+CHAT_HISTORY_MAX_USERS = int(os.getenv("CHAT_HISTORY_MAX_USERS", "5000"))
+CHAT_HISTORY_IDLE_TTL_SECONDS = float(os.getenv("CHAT_HISTORY_IDLE_TTL_SECONDS", "3600"))
+# Database backend: flush buffered turns this often, or as soon as this many are waiting
+CHAT_HISTORY_FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL_SECONDS", "0.5"))
+CHAT_HISTORY_BATCH_SIZE = int(os.getenv("CHAT_HISTORY_BATCH_SIZE", "100"))
+# Buffered writes kept while the database is unreachable; the oldest are dropped beyond this
+CHAT_HISTORY_MAX_BUFFERED = int(os.getenv("CHAT_HISTORY_MAX_BUFFERED", "10000"))
+
+
+def _turn_size(turn: Dict[str, str]) -> int:
+    """Approximate bytes held by one turn (the dict plus its strings)"""
+    return sys.getsizeof(turn) + sum(sys.getsizeof(value) for value in turn.values())
+
+
+class _UserHistory:
+    __slots__ = ("turns", "last_active", "bytes")
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.last_active = 0.0
+        self.bytes = 0
+
+
+class ConversationStore(ABC):
+    """Where chat services keep per-user history. append() and clear() never wait on I/O"""
+
+    backend = "none"
+
+    async def start(self):
+        """Begin background work (if any) - called from the app lifespan"""
+
+    async def stop(self):
+        """Finish background work, writing out anything still buffered"""
+
+    @abstractmethod
+    def append(self, user_id: str, user_message: str, assistant_message: str):
+        """Record one exchange"""
+
+    @abstractmethod
+    async def get(self, user_id: str) -> List[Dict[str, str]]:
+        """The user's recent turns, oldest first"""
+
+    @abstractmethod
+    def clear(self, user_id: str) -> bool:
+        """Forget the user's history"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Size and activity figures for health checks"""
+
+
+class ConversationHistory(ConversationStore):
+    backend = "memory"
+
+    def __init__(self, max_turns: int = CHAT_HISTORY_MAX_TURNS, max_users: int = CHAT_HISTORY_MAX_USERS,
+                 idle_ttl_seconds: float = CHAT_HISTORY_IDLE_TTL_SECONDS):
+        """Last max_turns exchanges per user, for at most max_users users (least recently active evicted
+        first); a user's history is dropped after idle_ttl_seconds without a message"""
+        self.max_turns = max_turns
+        self.max_users = max_users
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._users: "OrderedDict[str, _UserHistory]" = OrderedDict()  # least recently active first
+        self._bytes = 0
+        self.evicted_users = 0
+        self.expired_users = 0
+
+    def append(self, user_id: str, user_message: str, assistant_message: str):
+        now = time.monotonic()
+        self._expire_idle(now)
+        history = self._users.get(user_id)
+        if history is None:
+            history = self._users[user_id] = _UserHistory(self.max_turns)
+        else:
+            self._users.move_to_end(user_id)
+        history.last_active = now
+
+        if len(history.turns) == history.turns.maxlen:
+            self._account(history, -_turn_size(history.turns[0]))  # The deque drops the oldest turn
+        turn = {"user": user_message, "assistant": assistant_message, "timestamp": datetime.now().isoformat()}
+        history.turns.append(turn)
+        self._account(history, _turn_size(turn))
+
+        while len(self._users) > self.max_users:
+            self._drop(next(iter(self._users)))
+            self.evicted_users += 1
+
+    async def get(self, user_id: str) -> List[Dict[str, str]]:
+        history = self._users.get(user_id)
+        if history is None:
+            return []
+        if time.monotonic() - history.last_active >= self.idle_ttl_seconds:
+            self._drop(user_id)
+            self.expired_users += 1
+            return []
+        return list(history.turns)
+
+    def clear(self, user_id: str) -> bool:
+        if user_id not in self._users:
+            return False
+        self._drop(user_id)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        self._expire_idle(time.monotonic())
+        return {
+            "backend": self.backend,
+            "users": len(self._users),
+            "turns": sum(len(history.turns) for history in self._users.values()),
+            "approx_bytes": self._bytes,
+            "max_users": self.max_users,
+            "max_turns_per_user": self.max_turns,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+            "evicted_users": self.evicted_users,
+            "expired_users": self.expired_users
+        }
+
+    def _expire_idle(self, now: float):
+        # Users are ordered by last activity, so the idle ones are at the front
+        while self._users:
+            user_id, history = next(iter(self._users.items()))
+            if now - history.last_active < self.idle_ttl_seconds:
+                break
+            self._drop(user_id)
+            self.expired_users += 1
+
+    def _account(self, history: _UserHistory, delta: int):
+        history.bytes += delta
+        self._bytes += delta
+
+    def _drop(self, user_id: str):
+        history = self._users.pop(user_id)
+        self._bytes -= history.bytes
+
+
+class DatabaseConversationStore(ConversationStore):
+    backend = "database"
+
+    def __init__(self, session_factory=None, max_turns: int = CHAT_HISTORY_MAX_TURNS,
+                 idle_ttl_seconds: float = CHAT_HISTORY_IDLE_TTL_SECONDS,
+                 flush_interval_seconds: float = CHAT_HISTORY_FLUSH_INTERVAL_SECONDS,
+                 batch_size: int = CHAT_HISTORY_BATCH_SIZE, max_buffered: int = CHAT_HISTORY_MAX_BUFFERED):
+        """History in the chat_turns table, shared by every worker on the same database.
+
+        Writes are buffered and flushed by a background task (write-behind), so recording a turn
+        adds no database round trip to the chat response. Reads merge the table with this
+        worker's unflushed writes. Turns older than idle_ttl_seconds are pruned.
+        """
+        if session_factory is None:
+            from database_config import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self._session_factory = session_factory
+        self.max_turns = max_turns
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+        self._buffer: List[tuple] = []  # ("append", row) / ("clear", user_id), in arrival order
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._last_prune = 0.0
+        self.flushed_turns = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped_writes = 0
+        self.last_flush_ms = 0.0
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"💾 Chat history write-behind started (every {self.flush_interval_seconds}s "
+                    f"or {self.batch_size} turns)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # Not cancelled: a flush interrupted mid-transaction would lose the turns it took
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self.flush()
+
+    def append(self, user_id: str, user_message: str, assistant_message: str):
+        self._enqueue(("append", {
+            "user_id": user_id,
+            "user_message": user_message,
+            "assistant_message": assistant_message,
+            "created_at": datetime.utcnow()
+        }))
+
+    def clear(self, user_id: str) -> bool:
+        self._enqueue(("clear", user_id))
+        return True
+
+    async def get(self, user_id: str) -> List[Dict[str, str]]:
+        # Unflushed writes for this user; a pending clear hides everything before it
+        pending, cleared = [], False
+        for op, value in self._buffer:
+            if op == "clear" and value == user_id:
+                pending, cleared = [], True
+            elif op == "append" and value["user_id"] == user_id:
+                pending.append(value)
+
+        stored = []
+        if not cleared and len(pending) < self.max_turns:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.idle_ttl_seconds)
+            async with self._session_factory() as db:
+                rows = (await db.execute(
+                    select(ChatTurn.user_message, ChatTurn.assistant_message, ChatTurn.created_at)
+                    .where(ChatTurn.user_id == user_id, ChatTurn.created_at >= cutoff)
+                    .order_by(ChatTurn.created_at.desc(), ChatTurn.id.desc())
+                    .limit(self.max_turns - len(pending))
+                )).all()
+            stored = [{"user_message": row.user_message, "assistant_message": row.assistant_message,
+                       "created_at": row.created_at} for row in reversed(rows)]
+
+        return [
+            {"user": turn["user_message"], "assistant": turn["assistant_message"],
+             "timestamp": turn["created_at"].isoformat()}
+            for turn in (stored + pending)[-self.max_turns:]
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "buffered_writes": len(self._buffer),
+            "flushed_turns": self.flushed_turns,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "dropped_writes": self.dropped_writes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_turns_per_user": self.max_turns,
+            "idle_ttl_seconds": self.idle_ttl_seconds
+        }
+
+    async def flush(self):
+        """Write the buffered turns and clears in one transaction (kept for a retry if it fails)"""
+        if not self._buffer:
+            await self._prune_if_due()
+            return
+        ops, self._buffer = self._buffer, []
+        start = time.perf_counter()
+        try:
+            async with self._session_factory() as db:
+                rows = []
+                for op, value in ops:
+                    if op == "append":
+                        rows.append(value)
+                        continue
+                    if rows:  # Keep order: turns sent before a clear are written before it
+                        await db.execute(insert(ChatTurn), rows)
+                        rows = []
+                    await db.execute(delete(ChatTurn).where(ChatTurn.user_id == value))
+                if rows:
+                    await db.execute(insert(ChatTurn), rows)
+                await db.commit()
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.error(f"Error writing {len(ops)} chat history changes, will retry: {e}")
+            self._buffer = ops + self._buffer
+            self._trim_buffer()
+            return
+        self.flushes += 1
+        self.flushed_turns += sum(1 for op, _ in ops if op == "append")
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        await self._prune_if_due()
+
+    def _enqueue(self, op: tuple):
+        self._buffer.append(op)
+        self._trim_buffer()
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _trim_buffer(self):
+        overflow = len(self._buffer) - self.max_buffered
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped_writes += overflow
+
+    async def _flush_loop(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def _prune_if_due(self):
+        """Delete turns past the TTL, at most once a minute"""
+        now = time.monotonic()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        cutoff = datetime.utcnow() - timedelta(seconds=self.idle_ttl_seconds)
+        try:
+            async with self._session_factory() as db:
+                await db.execute(delete(ChatTurn).where(ChatTurn.created_at < cutoff))
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error pruning old chat history: {e}")
+
+
+def create_conversation_store() -> ConversationStore:
+    """The history backend selected by CHAT_HISTORY_BACKEND"""
+    if CHAT_HISTORY_BACKEND == "database":
+        return DatabaseConversationStore()
+    if CHAT_HISTORY_BACKEND != "memory":
+        logger.warning(f"Unknown CHAT_HISTORY_BACKEND '{CHAT_HISTORY_BACKEND}', keeping history in memory")
+    return ConversationHistory()
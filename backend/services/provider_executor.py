@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, Optional
+
+import metrics
+
+
+class ProviderQueueFull(Exception):
+    """Raised when a provider already has max_queue calls waiting for a slot"""
+
+
+class BoundedProviderExecutor:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        """Run blocking provider SDK calls on a dedicated pool, at most max_concurrency at a time.
+
+        Up to max_queue further calls wait for a slot; beyond that new calls are rejected with
+        ProviderQueueFull. Concurrent calls with the same key share one upstream call (single-flight).
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._threads = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"{name}-provider")
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.pending = 0  # upstream calls waiting or running
+        self.running = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    async def run(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call fn(*args, **kwargs) on a provider thread, or join the identical call already in flight.
+
+        Cancelling the caller (e.g. asyncio.wait_for timing out) doesn't cancel the shared call:
+        it keeps its slot until the provider answers, so the concurrency limit stays honest.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            metrics.PROVIDER_COALESCED.inc(provider=self.name)
+        else:
+            self._admit()
+            task = asyncio.ensure_future(self._call(time.perf_counter(), partial(fn, *args, **kwargs)))
+            self._in_flight[key] = task
+            task.add_done_callback(partial(self._finished, key))
+        return await asyncio.shield(task)
+
+    async def _call(self, queued_at: float, call: Callable[[], Any]) -> Any:
+        async with self._slots:
+            started = time.perf_counter()
+            metrics.PROVIDER_QUEUE_WAIT.observe(started - queued_at, provider=self.name)
+            self.running += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._threads, call)
+            finally:
+                self.running -= 1
+                metrics.PROVIDER_CALL_LATENCY.observe(time.perf_counter() - started, provider=self.name)
+
+    async def stream(self, fn: Callable[..., Iterable[Any]], *args,
+                     item_timeout: Optional[float] = None, **kwargs) -> AsyncIterator[Any]:
+        """Iterate fn(*args, **kwargs) on a provider thread, yielding each item as soon as it arrives.
+
+        Streams are never coalesced. A stream holds its slot until the provider thread is done, even
+        if the consumer stops early; item_timeout bounds the wait for each item (asyncio.TimeoutError).
+        """
+        self._admit()
+        queued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            self._release_pending()
+            raise
+
+        started = time.perf_counter()
+        metrics.PROVIDER_QUEUE_WAIT.observe(started - queued_at, provider=self.name)
+        self.running += 1
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+        end = object()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for item in fn(*args, **kwargs):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(items.put_nowait, (item, None))
+                loop.call_soon_threadsafe(items.put_nowait, (end, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(items.put_nowait, (end, e))
+
+        def thread_done(_):
+            self.running -= 1
+            metrics.PROVIDER_CALL_LATENCY.observe(time.perf_counter() - started, provider=self.name)
+            self._slots.release()
+            self._release_pending()
+
+        loop.run_in_executor(self._threads, produce).add_done_callback(thread_done)
+        try:
+            while True:
+                item, error = await asyncio.wait_for(items.get(), item_timeout)
+                if item is end:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stop.set()
+
+    def _admit(self):
+        """Count a new upstream call as pending, or reject it when the queue is full"""
+        if self.pending >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            metrics.PROVIDER_REJECTED.inc(provider=self.name)
+            raise ProviderQueueFull(f"{self.name}: {self.pending} calls already waiting or running")
+        self.pending += 1
+        metrics.PROVIDER_PENDING.inc(provider=self.name)
+
+    def _release_pending(self):
+        self.pending -= 1
+        metrics.PROVIDER_PENDING.dec(provider=self.name)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        self._release_pending()
+        if not task.cancelled():
+            task.exception()  # Every caller may have timed out; don't log "exception was never retrieved"
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.pending - self.running,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected
+        }
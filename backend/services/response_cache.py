@@ -0,0 +1,111 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+import metrics
+
+# Students in a class ask the same few questions about the same story; reuse the answers
+TUTOR_CACHE_TTL_SECONDS = float(os.getenv("TUTOR_CACHE_TTL_SECONDS", "3600"))
+TUTOR_CACHE_MAX_ENTRIES = int(os.getenv("TUTOR_CACHE_MAX_ENTRIES", "2000"))
+
+# Only real answers are reused - a fallback after a provider error or timeout is not
+CACHEABLE_MODES = {"smart_mock", "gemini_ai"}
+
+_PER_CALL_FIELDS = ("user_id", "timestamp")
+
+
+def normalize_question(message: str) -> str:
+    """'  What is the MORAL?? ' and 'what is the moral' share a cache entry"""
+    return " ".join(message.lower().split()).strip(" ?!.,;:")
+
+
+def cache_key(user_message: str, context: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str, str]]:
+    """(story title, user level, normalized question), or None when there is no question to cache"""
+    question = normalize_question(user_message or "")
+    if not question:
+        return None
+    context = context or {}
+    story = context.get("currentStory") or {}
+    progress = context.get("userProgress") or {}
+    return story.get("title", ""), progress.get("level", "Beginner"), question
+
+
+class TutorResponseCache:
+    def __init__(self, ttl_seconds: float = TUTOR_CACHE_TTL_SECONDS, max_entries: int = TUTOR_CACHE_MAX_ENTRIES):
+        """Bounded LRU of question key -> tutor response, each entry expiring after the TTL"""
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, tuple]" = OrderedDict()  # key -> (response, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() >= entry[1]:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            metrics.TUTOR_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        metrics.TUTOR_CACHE_LOOKUPS.inc(result="hit")
+        return entry[0]
+
+    def put(self, key: Tuple, response: Dict[str, Any]):
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        shared = {field: value for field, value in response.items() if field not in _PER_CALL_FIELDS}
+        self._entries[key] = (shared, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+def cached_response(key: Tuple, user_id: str) -> Optional[Dict[str, Any]]:
+    """The cached answer for key, addressed to this user, or None"""
+    cached = tutor_response_cache.get(key)
+    if cached is None:
+        return None
+    return {**cached, "suggestions": list(cached.get("suggestions", [])),
+            "user_id": user_id, "timestamp": datetime.now().isoformat()}
+
+
+def cached_tutor_response(get_tutor_response):
+    """Decorate a chat service's get_tutor_response so repeated questions skip the service"""
+
+    @wraps(get_tutor_response)
+    async def wrapper(self, user_message: str, user_id: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        key = cache_key(user_message, context)
+        if key is not None:
+            cached = cached_response(key, user_id)
+            if cached is not None:
+                return cached
+
+        response = await get_tutor_response(self, user_message, user_id, context)
+        if key is not None and response.get("mode") in CACHEABLE_MODES:
+            tutor_response_cache.put(key, response)
+        return response
+
+    return wrapper
+
+
+# Create singleton instance
+tutor_response_cache = TutorResponseCache()
+metrics.TUTOR_CACHE_ENTRIES.set_function(lambda: tutor_response_cache.stats()["entries"])
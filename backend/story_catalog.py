@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Any, Optional
+
+from pydantic_schemas import Story as StorySchema, StoryList
+
+logger = logging.getLogger(__name__)
+
+# Touched by any process that writes stories; the API reloads when it changes.
+# A relative path is resolved against this directory, so scripts run from anywhere agree on it
+STORY_CATALOG_STAMP = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.getenv("STORY_CATALOG_STAMP", ".story_catalog_stamp")
+)
+# How often (seconds) the API looks at the stamp file
+STORY_CATALOG_CHECK_SECONDS = float(os.getenv("STORY_CATALOG_CHECK_SECONDS", "2"))
+
+
+def mark_catalog_stale():
+    """Tell running API processes that the stories table changed"""
+    with open(STORY_CATALOG_STAMP, "a"):
+        os.utime(STORY_CATALOG_STAMP, None)
+
+
+def _stamp_mtime() -> float:
+    try:
+        return os.stat(STORY_CATALOG_STAMP).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _parse_json_field(value) -> List[Dict[str, Any]]:
+    """Scenes/quiz may be stored as a JSON string inside the JSON column"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or []
+
+
+def _dump(data) -> bytes:
+    """Serialize the way FastAPI's JSONResponse does"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(body: bytes) -> str:
+    """Strong ETag derived from the response content"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class CachedStory:
+    """A story row with its parsed content and pre-serialized responses"""
+
+    def __init__(self, story):
+        self.id = story.id
+        self.title = story.title
+        self.category = story.category
+        self.is_active = story.is_active
+        self.total_scenes = story.total_scenes
+        self.scenes = _parse_json_field(story.scenes)
+        self.quiz = _parse_json_field(story.quiz)
+
+        self.list_json = StoryList.model_validate(story).model_dump_json().encode("utf-8")
+        self.detail_json = StorySchema(
+            id=story.id,
+            title=story.title,
+            description=story.description,
+            difficulty_level=story.difficulty_level,
+            category=story.category,
+            scenes=self.scenes,
+            quiz=self.quiz,
+            total_scenes=story.total_scenes,
+            created_at=story.created_at,
+            is_active=story.is_active,
+        ).model_dump_json().encode("utf-8")
+        self.scenes_json = _dump({
+            "story_id": story.id,
+            "title": story.title,
+            "scenes": self.scenes,  # Array of 3 scenes
+            "total_scenes": story.total_scenes,
+            "quiz": self.quiz  # Array of quiz questions
+        })
+        self.detail_etag = _etag(self.detail_json)
+        self.scenes_etag = _etag(self.scenes_json)
+
+
+class StoryCatalog:
+    def __init__(self):
+        """In-process copy of the stories table, loaded at startup"""
+        self.version = 0
+        self.stories: Dict[int, CachedStory] = {}
+        self.list_json = b"[]"
+        self.list_etag = _etag(self.list_json)
+        self._stamp = 0.0
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        """(Re)load every story from the database and rebuild the serialized responses"""
+        from sqlalchemy import select
+        from database_config import AsyncSessionLocal
+        from database_models import Story
+
+        async with self._lock:
+            stamp = _stamp_mtime()
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(select(Story).order_by(Story.id))).scalars().all()
+
+            stories = {}
+            for row in rows:
+                try:
+                    stories[row.id] = CachedStory(row)
+                except Exception as e:
+                    logger.error(f"Skipping story {row.id} in catalog: {e}")
+
+            self.stories = stories
+            self.list_json = b"[" + b",".join(s.list_json for s in stories.values() if s.is_active) + b"]"
+            self.list_etag = _etag(self.list_json)
+            self.version += 1
+            self._stamp = stamp
+            self._checked_at = time.monotonic()
+            logger.info(f"📚 Story catalog v{self.version} loaded with {len(stories)} stories")
+
+    async def ensure_fresh(self):
+        """Reload if a story writer touched the stamp file since the last load"""
+        now = time.monotonic()
+        if now - self._checked_at < STORY_CATALOG_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        if _stamp_mtime() != self._stamp:
+            await self.load()
+
+    def get(self, story_id: int, active_only: bool = True) -> Optional[CachedStory]:
+        story = self.stories.get(story_id)
+        if story is None or (active_only and not story.is_active):
+            return None
+        return story
+
+
+# Create singleton instance
+story_catalog = StoryCatalog()
@@ -0,0 +1,92 @@
+"""
+Shared fixtures for the API tests
+The app is imported once per test run against a throwaway SQLite database, with one active
+3-scene story (STORY_ID) whose quiz answers are all option 1.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Must be set before the app is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("BCRYPT_ROUNDS", "4")  # Keep signup/login fast
+
+from fastapi.testclient import TestClient
+
+import database_config
+import main
+from auth_utils import verify_token
+from database_models import Story
+
+STORY_ID = 1
+QUESTIONS = 5
+CORRECT_ANSWERS = {str(i): 1 for i in range(QUESTIONS)}
+PASSWORD = "test-password"  # Every signed-up student's password
+
+
+class Student:
+    def __init__(self, user_id: int, username: str, token: str):
+        self.id = user_id
+        self.username = username
+        self.token = token
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient with the app's lifespan running for the whole test session"""
+    database_config.create_tables()
+    with database_config.SessionLocal() as db:
+        quiz = [{"question": f"Question {i}", "options": ["a", "b", "c", "d"], "correct": 1} for i in range(QUESTIONS)]
+        scenes = [{"scene_id": i + 1, "text": "Once upon a time..."} for i in range(3)]
+        db.add(Story(
+            id=STORY_ID, title="Test story", description="Test story", difficulty_level="beginner",
+            category="wisdom", scenes=json.dumps(scenes), quiz=json.dumps(quiz), total_scenes=3, is_active=True
+        ))
+        db.commit()
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def sign_up(client) -> Student:
+    """Sign up and log in a new student"""
+    username = f"student_{uuid.uuid4().hex[:10]}"
+    response = client.post("/auth/signup", json={
+        "email": f"{username}@example.com", "username": username, "password": PASSWORD, "full_name": username
+    })
+    assert response.status_code == 200, response.text
+    token = client.post("/auth/login", json={"username": username, "password": PASSWORD}).json()["access_token"]
+    return Student(verify_token(token)["user_id"], username, token)
+
+
+@pytest.fixture
+def student(client) -> Student:
+    return sign_up(client)
+
+
+def start_session(client, student: Student) -> int:
+    response = client.post("/api/sessions", headers=student.headers, json={"story_id": STORY_ID})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def read_story(client, student: Student, answers=None) -> int:
+    """Start a session, read all 3 scenes and submit the quiz; returns the session id"""
+    session_id = start_session(client, student)
+    for scene in range(3):
+        response = client.post(f"/api/sessions/{session_id}/complete_scene", headers=student.headers,
+                               json={"scene_index": scene, "reading_time_seconds": 30})
+        assert response.status_code == 200, response.text
+    response = client.post(f"/api/sessions/{session_id}/submit_quiz", headers=student.headers,
+                           json={"quiz_answers": answers or CORRECT_ANSWERS, "total_quiz_time_seconds": 20})
+    assert response.status_code == 200, response.text
+    return session_id
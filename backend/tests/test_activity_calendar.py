@@ -0,0 +1,74 @@
+"""
+Checks the activity calendar bitmaps against a plain day-by-day computation over the same set of
+dates, on hand-picked edge cases and random histories (sparse, dense, spanning year boundaries
+and leap years).
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import activity_calendar
+from conftest import read_story
+
+
+def naive_current_streak(days, today: date) -> int:
+    streak = 0
+    while today - timedelta(days=streak) in days:
+        streak += 1
+    return streak
+
+
+def naive_longest_streak(days) -> int:
+    # Every run is counted back from its last day
+    return max((naive_current_streak(days, day) for day in days if day + timedelta(days=1) not in days), default=0)
+
+
+def random_history(rng: random.Random):
+    """A set of active days plus the 'today' to measure the current streak at"""
+    start = date(rng.randint(2019, 2026), 1, 1) + timedelta(days=rng.randint(0, 364))
+    span = rng.randint(1, 800)
+    density = rng.choice([0.05, 0.5, 0.9, 1.0])
+    days = {start + timedelta(days=i) for i in range(span) if rng.random() < density}
+    today = start + timedelta(days=rng.randint(0, span + 3))
+    return days, today
+
+
+EDGE_CASES = [
+    (set(), date(2026, 3, 1)),
+    ({date(2023, 12, 31), date(2024, 1, 1)}, date(2024, 1, 1)),  # Streak across New Year
+    ({date(2024, 2, 28), date(2024, 2, 29), date(2024, 3, 1)}, date(2024, 3, 1)),  # Leap day
+    ({date(2024, 12, 31)}, date(2025, 1, 1)),  # Today inactive
+]
+_rng = random.Random(0)
+HISTORIES = EDGE_CASES + [random_history(_rng) for _ in range(300)]
+
+
+@pytest.mark.parametrize("days, today", HISTORIES)
+def test_calendar_matches_day_by_day(days, today):
+    calendar = activity_calendar.from_dates(days)
+    marked = {}
+    for day in days:
+        marked = activity_calendar.mark_day(marked, day)
+
+    assert marked == calendar
+    assert activity_calendar.current_streak(calendar, today) == naive_current_streak(days, today)
+    assert activity_calendar.longest_streak(calendar) == naive_longest_streak(days)
+    for year in {day.year for day in days}:
+        assert activity_calendar.active_days(calendar, year) == sorted(day for day in days if day.year == year)
+    for day in (today, today - timedelta(days=1), min(days, default=today)):
+        assert activity_calendar.is_active(calendar, day) == (day in days)
+
+
+def test_activity_calendar_endpoint(client, student):
+    read_story(client, student)
+
+    response = client.get("/api/user/activity_calendar", headers=student.headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["current_streak"] == 1
+    assert body["longest_streak"] == 1
+    assert body["total_active_days"] == 1
+    assert body["active_days"] == [datetime.utcnow().date().isoformat()]
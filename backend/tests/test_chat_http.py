@@ -0,0 +1,11 @@
+def test_chat_requires_a_token(client):
+    response = client.post("/api/chat", json={"message": "hello"})
+    assert response.status_code in (401, 403)
+
+
+def test_chat_is_keyed_by_the_token_user(client, student):
+    response = client.post("/api/chat", headers=student.headers,
+                           json={"message": "hello", "user_id": "someone-else", "context": {}})
+
+    assert response.status_code == 200
+    assert response.json()["user_id"] == str(student.id)
@@ -0,0 +1,50 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from conftest import sign_up
+
+
+def _url(student) -> str:
+    return f"/ws/chat/{student.id}?token={student.token}"
+
+
+def test_message_streams_tokens_then_done(client, student):
+    with client.websocket_connect(_url(student)) as ws:
+        ws.send_json({"message": "What is the moral of the story?", "context": {}})
+        events = []
+        while not events or events[-1]["type"] == "chat_token":
+            events.append(ws.receive_json())
+
+    assert events[-1]["type"] == "chat_done"
+    assert len(events) > 1 and all(event["type"] == "chat_token" for event in events[:-1])
+    streamed = "".join(event["text"] for event in events[:-1])
+    assert streamed.strip() == events[-1]["response"].strip()
+
+
+def test_bad_frames_get_chat_error_and_keep_the_connection(client, student):
+    with client.websocket_connect(_url(student)) as ws:
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "chat_error"
+        ws.send_json({"text": "no message key"})
+        assert ws.receive_json()["type"] == "chat_error"
+
+        ws.send_json({"message": "hello"})
+        event = ws.receive_json()
+        while event["type"] == "chat_token":
+            event = ws.receive_json()
+        assert event["type"] == "chat_done"
+
+
+def test_token_for_another_user_is_refused(client, student):
+    other = sign_up(client)
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect(f"/ws/chat/{other.id}?token={student.token}") as ws:
+            ws.receive_json()
+    assert refused.value.code == 1008
+
+
+def test_invalid_token_is_refused(client, student):
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect(f"/ws/chat/{student.id}?token=garbage") as ws:
+            ws.receive_json()
+    assert refused.value.code == 1008
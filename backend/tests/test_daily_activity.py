@@ -0,0 +1,30 @@
+import database_config
+from conftest import read_story, sign_up
+from database_models import DailyActivity
+
+
+def _rows(student):
+    with database_config.SessionLocal() as db:
+        return db.query(DailyActivity).filter(DailyActivity.user_id == student.id).all()
+
+
+def test_one_row_per_day_with_summed_counts(client, student):
+    read_story(client, student)
+    read_story(client, student)
+
+    rows = _rows(student)
+
+    assert len(rows) == 1
+    assert rows[0].scenes_read == 6
+    assert rows[0].stories_completed == 2
+    assert rows[0].quiz_attempts == 2
+    assert rows[0].activity_day == rows[0].activity_date.date()
+
+
+def test_rows_are_per_user(client, student):
+    other = sign_up(client)
+    read_story(client, student)
+    read_story(client, other)
+
+    assert len(_rows(student)) == 1
+    assert len(_rows(other)) == 1
@@ -0,0 +1,51 @@
+"""
+classify_intent() finds the top-priority intent with one trie-shaped regex scan. These check it
+against the straightforward definition (first intent in INTENT_KEYWORDS with any keyword as a
+substring of the message) on random messages built from keywords, keyword fragments and filler.
+"""
+
+import random
+
+import pytest
+
+from services.chat_service_mock import INTENT_KEYWORDS, classify_intent
+
+FILLER = ["the", "story", "what", "is", "a", "about", "this", "who", "scene", "end", "t", "e", "w", "h", "?", "!"]
+KEYWORDS = [keyword for _, words in INTENT_KEYWORDS for keyword in words]
+
+
+def reference_intent(message_lower: str):
+    for intent, keywords in INTENT_KEYWORDS:
+        if any(keyword in message_lower for keyword in keywords):
+            return intent
+    return None
+
+
+def random_message(rng: random.Random) -> str:
+    """Words, keyword prefixes/suffixes and keywords, joined with or without spaces"""
+    parts = []
+    for _ in range(rng.randint(0, 8)):
+        roll = rng.random()
+        if roll < 0.3:
+            parts.append(rng.choice(KEYWORDS))
+        elif roll < 0.6:
+            keyword = rng.choice(KEYWORDS)
+            cut = rng.randint(1, len(keyword))
+            parts.append(keyword[:cut] if rng.random() < 0.5 else keyword[-cut:])
+        else:
+            parts.append(rng.choice(FILLER))
+    return rng.choice([" ", "", "-"]).join(parts)
+
+
+@pytest.mark.parametrize("message", ["", "hi", "this", "whyhare", "a tortoise and a hare", "bullies at school",
+                                     "hello greetings"] + KEYWORDS)
+def test_known_messages(message):
+    assert classify_intent(message) == reference_intent(message)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_messages_match_reference(seed):
+    rng = random.Random(seed)
+    mismatches = [(m, classify_intent(m), reference_intent(m)) for m in (random_message(rng) for _ in range(30_000))
+                  if classify_intent(m) != reference_intent(m)]
+    assert not mismatches, mismatches[:10]
@@ -0,0 +1,122 @@
+"""
+Drives BoundedProviderExecutor with blocking stand-ins for a provider SDK (time.sleep on the
+provider threads) and checks the guarantees the chat services rely on.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.provider_executor import BoundedProviderExecutor, ProviderQueueFull
+
+
+def slow(seconds: float, result="ok", calls: list = None):
+    if calls is not None:
+        calls.append(threading.get_ident())
+    time.sleep(seconds)
+    return result
+
+
+def slow_items(count: int, seconds: float, finished: threading.Event = None):
+    try:
+        for i in range(count):
+            time.sleep(seconds)
+            yield i
+    finally:
+        if finished is not None:
+            finished.set()
+
+
+async def idle(executor: BoundedProviderExecutor, within: float = 2.0):
+    """Wait until nothing is pending on the executor"""
+    deadline = time.monotonic() + within
+    while executor.pending and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    assert executor.pending == 0 and executor.running == 0, executor.stats()
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_upstream_call():
+    executor = BoundedProviderExecutor("test", max_concurrency=4, max_queue=10)
+    calls = []
+    results = await asyncio.gather(*(executor.run("same", slow, 0.1, "answer", calls) for _ in range(5)))
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert executor.coalesced == 4, executor.stats()
+    await idle(executor)
+
+    await asyncio.gather(executor.run("a", slow, 0.05, calls=calls), executor.run("b", slow, 0.05, calls=calls))
+    assert len(calls) == 3, "different keys must not be coalesced"
+
+
+@pytest.mark.asyncio
+async def test_caller_timeout_keeps_the_slot():
+    executor = BoundedProviderExecutor("test", max_concurrency=1, max_queue=10)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(executor.run("q", slow, 0.3), timeout=0.05)
+    # The provider is still answering: its slot and pending count must stay taken
+    assert executor.running == 1 and executor.pending == 1, executor.stats()
+
+    started = time.perf_counter()
+    assert await executor.run("next", slow, 0) == "ok"
+    assert time.perf_counter() - started >= 0.2, "second call got a slot before the first call finished"
+    await idle(executor)
+
+
+@pytest.mark.asyncio
+async def test_calls_beyond_the_queue_are_rejected():
+    executor = BoundedProviderExecutor("test", max_concurrency=1, max_queue=1)
+    running = asyncio.ensure_future(executor.run("a", slow, 0.2))
+    queued = asyncio.ensure_future(executor.run("b", slow, 0.2))
+    await asyncio.sleep(0.02)
+    with pytest.raises(ProviderQueueFull):
+        await executor.run("c", slow, 0)
+    assert executor.rejected == 1, executor.stats()
+    # Joining a call already in flight takes no queue space
+    assert await executor.run("a", slow, 0) == "ok"
+    await asyncio.gather(running, queued)
+    await idle(executor)
+
+    stream = executor.stream(slow_items, 1, 0)
+    blocker = asyncio.ensure_future(executor.run("d", slow, 0.1))
+    queued = asyncio.ensure_future(executor.run("e", slow, 0.1))
+    await asyncio.sleep(0.02)
+    with pytest.raises(ProviderQueueFull):
+        await stream.__anext__()
+    await asyncio.gather(blocker, queued)
+    await idle(executor)
+
+
+@pytest.mark.asyncio
+async def test_stream_gives_its_slot_back():
+    executor = BoundedProviderExecutor("test", max_concurrency=1, max_queue=10)
+
+    assert [item async for item in executor.stream(slow_items, 3, 0.01)] == [0, 1, 2]
+    await idle(executor)
+
+    # Consumer stops early: the provider thread stops at its next item and the slot comes back
+    finished = threading.Event()
+    stream = executor.stream(slow_items, 100, 0.01, finished)
+    async for _ in stream:
+        break
+    await stream.aclose()
+    await idle(executor)
+    assert finished.is_set(), "provider thread kept iterating after the consumer left"
+
+    # Provider error
+    def failing():
+        yield 1
+        raise RuntimeError("provider failed")
+
+    with pytest.raises(RuntimeError):
+        _ = [item async for item in executor.stream(failing)]
+    await idle(executor)
+
+    # Item timeout: the slot is held until the provider thread actually finishes
+    with pytest.raises(asyncio.TimeoutError):
+        _ = [item async for item in executor.stream(slow_items, 1, 0.2, item_timeout=0.05)]
+    assert executor.running == 1, executor.stats()
+    await idle(executor)
+    assert await executor.run("after", slow, 0) == "ok"
@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import STORY_ID
+
+STORY_URLS = ["/api/stories", f"/api/stories/{STORY_ID}", f"/api/stories/{STORY_ID}/scenes"]
+
+
+@pytest.mark.parametrize("url", STORY_URLS)
+def test_matching_etag_returns_304(client, student, url):
+    first = client.get(url, headers=student.headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get(url, headers={**student.headers, "If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+
+@pytest.mark.parametrize("if_none_match", ["W/{etag}", '"stale", {etag}', "*"])
+def test_weak_lists_and_wildcard_match(client, student, if_none_match):
+    etag = client.get(STORY_URLS[1], headers=student.headers).headers["ETag"]
+
+    response = client.get(STORY_URLS[1], headers={**student.headers, "If-None-Match": if_none_match.format(etag=etag)})
+
+    assert response.status_code == 304
+
+
+def test_stale_etag_returns_body(client, student):
+    response = client.get(STORY_URLS[1], headers={**student.headers, "If-None-Match": '"stale"'})
+
+    assert response.status_code == 200
+    assert response.json()["id"] == STORY_ID
+
+
+def test_etags_differ_between_representations(client, student):
+    etags = {client.get(url, headers=student.headers).headers["ETag"] for url in STORY_URLS}
+    assert len(etags) == len(STORY_URLS)
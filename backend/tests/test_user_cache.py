@@ -0,0 +1,109 @@
+import pytest
+
+import user_cache as user_cache_module
+from conftest import PASSWORD
+from database_models import User
+from user_cache import AuthUserCache, user_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(user_cache_module.time, "time", clock)
+    return clock
+
+
+def _user(user_id: int) -> User:
+    return User(id=user_id, email=f"u{user_id}@example.com", username=f"u{user_id}", is_active=True)
+
+
+def test_hit_and_miss_counts(clock):
+    cache = AuthUserCache(ttl_seconds=60)
+    assert cache.get("t1") is None
+    cache.put("t1", _user(1))
+
+    assert cache.get("t1").id == 1
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = AuthUserCache(ttl_seconds=60)
+    cache.put("t1", _user(1))
+
+    clock.now += 59
+    assert cache.get("t1") is not None
+    clock.now += 1
+    assert cache.get("t1") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entry_never_outlives_its_token(clock):
+    cache = AuthUserCache(ttl_seconds=60)
+    cache.put("t1", _user(1), token_expires_at=clock.now + 5)
+
+    clock.now += 5
+    assert cache.get("t1") is None
+
+
+def test_zero_ttl_disables_cache(clock):
+    cache = AuthUserCache(ttl_seconds=0)
+    cache.put("t1", _user(1))
+    assert cache.get("t1") is None
+
+
+def test_invalidate_user_drops_all_their_tokens(clock):
+    cache = AuthUserCache(ttl_seconds=60)
+    cache.put("a1", _user(1))
+    cache.put("a2", _user(1))
+    cache.put("b1", _user(2))
+
+    cache.invalidate_user(1)
+
+    assert cache.get("a1") is None and cache.get("a2") is None
+    assert cache.get("b1").id == 2
+    cache.invalidate_user(3)  # Unknown users are a no-op
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = AuthUserCache(ttl_seconds=60, max_entries=2)
+    cache.put("t1", _user(1))
+    cache.put("t2", _user(2))
+    cache.get("t1")  # t2 is now the oldest
+
+    cache.put("t3", _user(3))
+
+    assert cache.get("t2") is None
+    assert cache.get("t1") is not None and cache.get("t3") is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_authenticated_request_is_cached(client, student):
+    user_cache.invalidate_user(student.id)
+    client.get("/api/user/progress", headers=student.headers)
+    hits = user_cache.hits
+
+    client.get("/api/user/progress", headers=student.headers)
+
+    assert user_cache.hits == hits + 1
+
+
+def test_login_invalidates_cached_tokens(client, student):
+    client.get("/api/user/progress", headers=student.headers)
+    assert user_cache.get(student.token) is not None
+
+    response = client.post("/auth/login", json={"username": student.username, "password": PASSWORD})
+    assert response.status_code == 200
+
+    assert user_cache.get(student.token) is None
+
+
+def test_health_reports_cache_stats(client):
+    assert set(client.get("/health").json()["auth_cache"]) == {"entries", "hits", "misses"}
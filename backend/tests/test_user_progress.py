@@ -0,0 +1,60 @@
+import database_config
+from conftest import read_story, start_session
+from database_models import UserProgress
+
+HALF_RIGHT = {"0": 1, "1": 1, "2": 1, "3": 0, "4": 0}  # 3 of 5 correct
+
+
+def _progress(client, student):
+    response = client.get("/api/user/progress", headers=student.headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _delete_progress_row(student):
+    with database_config.SessionLocal() as db:
+        db.query(UserProgress).filter(UserProgress.user_id == student.id).delete()
+        db.commit()
+
+
+def test_counters_follow_reads_and_quizzes(client, student):
+    read_story(client, student)
+    read_story(client, student, HALF_RIGHT)
+    start_session(client, student)  # Started, nothing read
+
+    progress = _progress(client, student)
+
+    assert progress["total_sessions"] == 3
+    assert progress["total_stories_completed"] == 2
+    assert progress["total_scenes_read"] == 6
+    assert progress["average_quiz_score"] == 80
+    assert progress["total_points"] == 160
+    assert progress["total_reading_time"] == 3  # 2 x (3 scenes x 30s + 20s quiz), in minutes
+    assert progress["current_streak"] == 1
+
+
+def test_read_without_progress_row_computes_counters(client, student):
+    read_story(client, student)
+    read_story(client, student, HALF_RIGHT)
+    expected = _progress(client, student)
+    _delete_progress_row(student)
+
+    progress = _progress(client, student)
+
+    for counter in ("total_sessions", "total_stories_completed", "total_scenes_read", "average_quiz_score",
+                    "current_streak"):
+        assert progress[counter] == expected[counter], counter
+    with database_config.SessionLocal() as db:
+        assert db.query(UserProgress).filter(UserProgress.user_id == student.id).count() == 0  # Reads stay pure
+
+
+def test_write_recreates_missing_progress_row(client, student):
+    _delete_progress_row(student)
+
+    read_story(client, student)
+
+    progress = _progress(client, student)
+    assert progress["id"] is not None
+    assert progress["total_sessions"] == 1
+    assert progress["total_stories_completed"] == 1
+    assert progress["total_scenes_read"] == 3
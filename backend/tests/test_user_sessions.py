@@ -0,0 +1,41 @@
+from conftest import sign_up, start_session
+
+
+def test_full_history_without_limit(client, student):
+    ids = [start_session(client, student) for _ in range(3)]
+
+    response = client.get("/api/user/sessions", headers=student.headers)
+
+    assert response.status_code == 200
+    assert [s["id"] for s in response.json()] == ids[::-1]  # Newest first
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_keyset_pages_cover_history_once(client, student):
+    ids = [start_session(client, student) for _ in range(5)]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/user/sessions", headers=student.headers, params=params)
+        assert response.status_code == 200
+        page = [s["id"] for s in response.json()]
+        assert len(page) <= 2
+        seen += page
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert seen == ids[::-1]
+
+
+def test_other_students_sessions_are_not_listed(client, student):
+    start_session(client, student)
+    other = sign_up(client)
+
+    assert client.get("/api/user/sessions", headers=other.headers).json() == []
+
+
+def test_invalid_cursor_is_rejected(client, student):
+    response = client.get("/api/user/sessions", headers=student.headers, params={"limit": 2, "cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,82 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+import metrics
+from database_models import User
+
+# How long a verified token keeps authenticating without a database lookup
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+_SNAPSHOT_FIELDS = ("id", "email", "username", "full_name", "created_at", "is_active")
+
+
+def snapshot_user(user: User) -> User:
+    """Detached copy of the user's profile columns, safe to share between requests"""
+    return User(**{field: getattr(user, field) for field in _SNAPSHOT_FIELDS})
+
+
+class AuthUserCache:
+    def __init__(self, ttl_seconds: float = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        """Bounded LRU of verified token -> user snapshot, each entry expiring after the TTL"""
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (user, expires_at)
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[User]:
+        entry = self._entries.get(token)
+        if entry is not None and time.time() >= entry[1]:
+            self._remove(token)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            metrics.AUTH_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        metrics.AUTH_CACHE_LOOKUPS.inc(result="hit")
+        return entry[0]
+
+    def put(self, token: str, user: User, token_expires_at: Optional[float] = None):
+        """Cache a snapshot until the TTL passes or the token itself expires, whichever is first"""
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = (user, expires_at)
+        self._tokens_by_user.setdefault(user.id, set()).add(token)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        """Forget every token of a user - call after deactivating or changing them, or on a new login"""
+        for token in list(self._tokens_by_user.get(user_id, ())):
+            self._remove(token)
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, token: str):
+        user, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user.id]
+
+
+# Create singleton instance
+user_cache = AuthUserCache()
+metrics.AUTH_CACHE_ENTRIES.set_function(lambda: user_cache.stats()["entries"])
@@ -100,12 +100,11 @@ const AiTutor = ({ user, onBack, currentStory = null }) => {
       const response = await fetch(`${API_BASE_URL}/api/chat`, {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json'
-          // Removed Authorization for now to test connection
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${user.token}`
         },
         body: JSON.stringify({
           message: messageText,
-          user_id: user.username,
           context: context
         })
       });